@@ -0,0 +1,14 @@
+from typing import Any, Callable, Dict
+
+from templ.engine import Engine
+
+
+def load(
+    engine: Engine, content: str, filename: str = "<benchmark>", **options: Any
+) -> Dict[str, Callable]:
+    """Compile `content` with `engine`, `options` going to `Engine.compile()`,
+    and run it. Returns the namespace its components were defined in."""
+    output, _ = engine.compile(content, **options)
+    namespace: Dict[str, Callable] = {}
+    exec(compile(output, filename, "exec"), namespace)
+    return namespace
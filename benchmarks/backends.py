@@ -0,0 +1,49 @@
+import time
+from typing import Callable
+
+from benchmarks._util import load
+from templ.engine import Engine
+
+CASES = [
+    ("./examples/demo.pytempl", "App", ()),
+    ("./examples/sample.pytempl", "Counter", ()),
+    ("./examples/sample.pytempl", "Button", ({"onclick": "alert()"},)),
+    ("./examples/directives.pytempl", "App", ()),
+]
+
+BACKENDS = ["concat", "join", "stream"]
+
+
+def throughput(render: Callable[[], str], duration: float) -> float:
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        render()
+        count += 1
+
+    return count / (time.perf_counter() - start)
+
+
+def main(duration: float = 1.0):
+    print(f"{'component':<40}" + "".join(f"{b + ' (req/s)':>18}" for b in BACKENDS))
+    for template, name, args in CASES:
+        with open(template, "r") as template_file:
+            content = template_file.read()
+
+        results = []
+        for backend in BACKENDS:
+            engine = Engine(backend=backend)
+            namespace = load(engine, content, template, format=False, minify=True)
+            component = namespace[name]
+            if backend == "stream":
+                render = lambda: "".join(component(*args))
+            else:
+                render = lambda: component(*args)
+            results.append(throughput(render, duration))
+
+        label = f"{template}:{name}"
+        print(f"{label:<40}" + "".join(f"{r:>18,.0f}" for r in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Render one email component for many recipients: a plain loop, then
+render_many in this process and across a process pool.
+
+    python -m benchmarks.batch --renders 200000 --workers 8
+"""
+
+import argparse
+import importlib
+import os
+import shutil
+import tempfile
+import time
+from typing import List
+
+from templ.batch import render_many
+from templ.engine import Engine
+
+TEMPLATE = """
+component Email(props) {
+  <template>
+    <html>
+    <body>
+      <h1>Hello {{ props["name"] }},</h1>
+      <p>Your order {{ props["order"] }} has shipped.</p>
+      <ul>
+        for item in {{ props["items"] }} {
+          <li>{{ item }}</li>
+        }
+      </ul>
+    </body>
+    </html>
+  </template>
+}
+"""
+
+
+def recipients(count: int):
+    for i in range(count):
+        yield {
+            "name": f"Customer {i}",
+            "order": f"#{i:08}",
+            "items": [f"item {j}" for j in range(i % 20)],
+        }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.batch")
+    parser.add_argument("--renders", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--backend", default="concat")
+    args = parser.parse_args(argv)
+
+    # workers import the component by module name, so it lives under the
+    # current directory
+    directory = os.path.relpath(tempfile.mkdtemp(prefix="pytempl_batch_", dir="."))
+    try:
+        open(os.path.join(directory, "__init__.py"), "w").close()
+        template = os.path.join(directory, "email.pytempl")
+        with open(template, "w") as template_file:
+            template_file.write(TEMPLATE)
+        Engine(backend=args.backend).render(template)
+        module = importlib.import_module(f"{os.path.basename(directory)}.email")
+
+        def loop():
+            for props in recipients(args.renders):
+                output = module.Email(props)
+                yield output if isinstance(output, str) else "".join(output)
+
+        runs = [
+            ("loop", loop),
+            (
+                "render_many",
+                lambda: render_many(module.Email, recipients(args.renders)),
+            ),
+            (
+                f"render_many, {args.workers} workers",
+                lambda: render_many(
+                    module.Email,
+                    recipients(args.renders),
+                    workers=args.workers,
+                    chunk_size=args.chunk_size,
+                ),
+            ),
+        ]
+        print(f"{args.renders} renders, {args.backend} backend")
+        for name, run in runs:
+            start = time.perf_counter()
+            size = sum(len(output) for output in run())
+            seconds = time.perf_counter() - start
+            print(f"{name:<28}{seconds:>10.2f} s{size / 1e6:>10.1f} MB")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Measure the HTML of a page with more and more instances of one client
+component, inlined and with the component's code in a static file.
+
+    python -m benchmarks.csr
+
+The first run downloads the vendored packages.
+"""
+
+import shutil
+import tempfile
+from typing import Callable
+
+from benchmarks._util import load
+from templ.engine import Engine
+from templ.styles import collect
+
+TEMPLATE = """
+@mode("csr")
+component Counter() {{
+  <script type="text/python">
+    count = 0
+  </script>
+
+  <template>
+    <button>Clicked {{{{ count }}}} times</button>
+  </template>
+}}
+
+component Page() {{
+  <template>
+    <main>
+      {calls}
+    </main>
+  </template>
+}}
+"""
+
+
+def page(engine: Engine, instances: int) -> Callable:
+    return load(engine, TEMPLATE.format(calls="@Counter()\n" * instances))["Page"]
+
+
+def main():
+    directory = tempfile.mkdtemp(prefix="pytempl_csr_")
+    try:
+        engines = {
+            "inline": Engine(),
+            "assets": Engine(csr_assets=directory, csr_assets_url="/assets"),
+        }
+        print(f"{'instances':>10}" + "".join(f"{name:>12}" for name in engines))
+        for instances in (1, 10, 100, 1000):
+            sizes = []
+            for engine in engines.values():
+                # a page is rendered under collect(), like ssg() does
+                with collect():
+                    sizes.append(len(page(engine, instances)().encode()))
+            print(f"{instances:>10}" + "".join(f"{size:>10} B" for size in sizes))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
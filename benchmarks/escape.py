@@ -0,0 +1,102 @@
+import time
+from typing import Callable
+
+from benchmarks._util import load
+from templ.engine import Engine
+
+# the same table rendered twice: once relying on autoescape, once escaping by
+# hand with html.escape around every interpolation
+AUTOESCAPE = """
+component Row(row) {
+  <template>
+    <tr>
+      <td>{{ row["name"] }}</td>
+      <td>{{ row["email"] }}</td>
+      <td>{{ row["city"] }}</td>
+      <td>{{ row["note"] }}</td>
+      <td>{{ row["id"] }}</td>
+      <td>{{ 42 }}</td>
+    </tr>
+  </template>
+}
+
+component Table(rows) {
+  <template>
+    <table>
+      for row in rows {
+        @Row({{ row }})
+      }
+    </table>
+  </template>
+}
+"""
+
+MANUAL = """
+import html
+
+component Row(row) {
+  <template>
+    <tr>
+      <td>{{ html.escape(str(row["name"])) }}</td>
+      <td>{{ html.escape(str(row["email"])) }}</td>
+      <td>{{ html.escape(str(row["city"])) }}</td>
+      <td>{{ html.escape(str(row["note"])) }}</td>
+      <td>{{ html.escape(str(row["id"])) }}</td>
+      <td>{{ html.escape(str(42)) }}</td>
+    </tr>
+  </template>
+}
+
+component Table(rows) {
+  <template>
+    <table>
+      for row in rows {
+        @Row({{ row }})
+      }
+    </table>
+  </template>
+}
+"""
+
+ROWS = [
+    {
+        "id": i,
+        "name": f"User {i}",
+        "email": f"user{i}@example.com",
+        "city": "Lagos",
+        "note": "<b>&</b>",
+    }
+    for i in range(1000)
+]
+
+
+def table(content: str, autoescape: bool) -> Callable:
+    engine = Engine(backend="join", autoescape=autoescape)
+    return load(engine, content, format=False, minify=True)["Table"]
+
+
+def throughput(render: Callable[[], str], duration: float) -> float:
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        render()
+        count += 1
+
+    return count / (time.perf_counter() - start)
+
+
+def main(duration: float = 2.0):
+    manual = table(MANUAL, autoescape=False)
+    auto = table(AUTOESCAPE, autoescape=True)
+    assert manual(ROWS).replace("&#x27;", "&#39;").replace("&quot;", "&#34;") == auto(
+        ROWS
+    )
+
+    baseline = throughput(lambda: manual(ROWS), duration)
+    result = throughput(lambda: auto(ROWS), duration)
+    print(f"{'html.escape everywhere':<28}{baseline:>12,.0f} renders/s")
+    print(f"{'autoescape':<28}{result:>12,.0f} renders/s ({result / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Compare the size of the example pages with and without minify_html.
+
+    python -m benchmarks.htmlmin
+"""
+
+import glob
+from html.parser import HTMLParser
+from typing import Callable, List, Tuple
+
+from benchmarks._util import load
+from templ.engine import Engine
+
+# attribute values HTML can't take unquoted, as literals and interpolated,
+# on elements that close normally, self-close or are void
+ATTRIBUTES = """
+component Attributes(a, b, c, d) {
+  <template>
+    <div title="a b" data="a=b" href="a/" alt="">x</div>
+    <div title={{ a }} data={{ b }} href={{ c }} alt={{ d }}>x</div>
+    <div title="a b" href="a/"/>
+    <div title={{ a }} href={{ c }}/>
+    <input value="a/"/>
+    <input value={{ c }}/>
+    <input value=""/>
+    <input value={{ d }}/>
+    <img alt="a b" src="a/"/>
+  </template>
+}
+"""
+
+VALUES = ("a b", "x onmouseover=alert(1)", "a/", "")
+
+
+class _Attributes(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.elements: List[Tuple[str, List[Tuple[str, str]]]] = []
+
+    def handle_starttag(self, tag, attrs):
+        self.elements.append((tag, [(name, value or "") for name, value in attrs]))
+
+    handle_startendtag = handle_starttag
+
+
+def attributes(html: str) -> List[Tuple[str, List[Tuple[str, str]]]]:
+    parser = _Attributes()
+    parser.feed(html)
+    parser.close()
+    return parser.elements
+
+
+def component(content: str, name: str, minify_html: bool) -> Callable:
+    return load(Engine(minify_html=minify_html), content)[name]
+
+
+def check():
+    rendered = [
+        component(ATTRIBUTES, "Attributes", minify)(*VALUES) for minify in (False, True)
+    ]
+    if attributes(rendered[0]) != attributes(rendered[1]):
+        raise AssertionError(f"minify_html changed attributes:\n{rendered[1]}")
+
+
+def main():
+    check()
+
+    print(f"{'template':<40}{'component':<16}{'plain':>10}{'minified':>10}")
+    for template in sorted(glob.glob("./examples/*.pytempl")):
+        with open(template, "r") as template_file:
+            content = template_file.read()
+        for name in ("App", "Counter"):
+            try:
+                sizes = [
+                    len(component(content, name, minify)()) for minify in (False, True)
+                ]
+            except (KeyError, TypeError):
+                continue
+            print(f"{template:<40}{name:<16}{sizes[0]:>8} B{sizes[1]:>8} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Generate thousands of pages from one dynamic route and time a full build,
+a rebuild with no changes and a rebuild where 1% of the data changed.
+
+    python -m benchmarks.pages --pages 50000 --workers 8
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import List
+
+from templ.engine import Engine
+
+ROUTE = """
+from {package}.data import paths
+
+component Page(slug, product) {{
+  <template>
+    <!DOCTYPE html>
+    <html>
+    <head><title>{{{{ product["name"] }}}}</title></head>
+    <body>
+      <h1>{{{{ product["name"] }}}}</h1>
+      <p>{{{{ product["description"] }}}}</p>
+      <ul>
+        for tag in {{{{ product["tags"] }}}} {{
+          <li>{{{{ tag }}}}</li>
+        }}
+      </ul>
+    </body>
+    </html>
+  </template>
+}}
+"""
+
+DATA = """
+VERSION = {version}
+CHANGED = {changed}
+
+
+def paths():
+    for i in range({pages}):
+        description = f"Product {{i}}, revision {{VERSION if i < CHANGED else 0}}"
+        yield {{
+            "slug": f"product-{{i}}",
+            "product": {{
+                "name": f"Product {{i}}",
+                "description": description,
+                "tags": ["new", "sale", f"group-{{i % 10}}"],
+            }},
+        }}
+"""
+
+
+def write_data(directory: str, pages: int, version: int, changed: int):
+    with open(os.path.join(directory, "data.py"), "w") as data_file:
+        data_file.write(DATA.format(pages=pages, version=version, changed=changed))
+    # the route module imports the data, so both are loaded again
+    for name in list(sys.modules):
+        if name.startswith(os.path.basename(directory)):
+            del sys.modules[name]
+
+
+def build(engine: Engine, directory: str, workers: int, batch_size: int) -> float:
+    start = time.perf_counter()
+    engine.ssg(directory, workers=workers, batch_size=batch_size)
+    return time.perf_counter() - start
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.pages")
+    parser.add_argument("--pages", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--backend", default="stream")
+    args = parser.parse_args(argv)
+
+    # pages are imported by module name, so the route lives under the
+    # current directory
+    directory = tempfile.mkdtemp(prefix="pytempl_pages_", dir=".")
+    directory = os.path.relpath(directory)
+    try:
+        package = os.path.basename(directory)
+        open(os.path.join(directory, "__init__.py"), "w").close()
+        with open(os.path.join(directory, "[slug].pytempl"), "w") as route:
+            route.write(ROUTE.format(package=package))
+
+        engine = Engine(backend=args.backend)
+        write_data(directory, args.pages, 0, 0)
+        full = build(engine, directory, args.workers, args.batch_size)
+        unchanged = build(engine, directory, args.workers, args.batch_size)
+        write_data(directory, args.pages, 1, args.pages // 100)
+        changed = build(engine, directory, args.workers, args.batch_size)
+
+        print(
+            f"{args.pages} pages, {args.workers} workers, batches of {args.batch_size}"
+        )
+        print(f"{'full build':<28}{full:>10.2f} s")
+        print(f"{'rebuild, nothing changed':<28}{unchanged:>10.2f} s")
+        print(f"{'rebuild, 1% changed':<28}{changed:>10.2f} s")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
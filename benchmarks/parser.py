@@ -0,0 +1,76 @@
+import glob
+import time
+from typing import Callable
+
+from lark import Lark
+
+from templ.grammar import grammar
+from templ.parser import get_parser, parse
+from templ.transformer import Transformer
+
+TEMPLATES = sorted(glob.glob("./examples/**/*.pytempl", recursive=True))
+
+# markup the LALR grammar must parse by itself, and the same way Earley does:
+# text that starts with a keyword, "}" in text, and text after an element
+CASES = [
+    "<p>if you want it</p>",
+    "<p>for more info</p>",
+    "<p>else what</p>",
+    "<p>a } b</p>",
+    "<p><b>a</b> } b</p>",
+    "<p>{{ x }} }</p>",
+    "@Card() { <b>x</b> Increase } tail",
+    "if you want it",
+    "if x > 1 { <p>big</p> } elif x<2 { <b>{{ x }}</b> } else { small }",
+    "for i in {{ items }} { <i>{{ i }}</i> }",
+    "@Card() { for more info <p>if so } ok</p> }",
+]
+
+
+def before(content: str):
+    l = Lark(grammar, start="program", propagate_positions=True)
+    return Transformer().transform(l.parse(content))
+
+
+def after(content: str):
+    return Transformer().transform(parse(content))
+
+
+def measure(compile: Callable[[str], str], content: str, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        compile(content)
+
+    return (time.perf_counter() - start) / rounds
+
+
+def check():
+    lalr = get_parser("lalr")
+    for template in TEMPLATES:
+        with open(template, "r") as template_file:
+            lalr.parse(template_file.read())
+    for case in CASES:
+        content = f"component A(x, items) {{ <template>{case}</template> }}"
+        expected = Transformer().transform(get_parser("earley").parse(content))
+        if Transformer().transform(lalr.parse(content)) != expected:
+            raise AssertionError(f"LALR and Earley disagree on {case!r}")
+
+
+def main(rounds: int = 20):
+    check()
+
+    # warm the process-wide cache so "after" shows the steady state of an ssr() run
+    get_parser()
+
+    print(f"{'template':<40}{'before (ms)':>14}{'after (ms)':>14}{'speedup':>10}")
+    for template in TEMPLATES:
+        with open(template, "r") as template_file:
+            content = template_file.read()
+
+        old = measure(before, content, rounds)
+        new = measure(after, content, rounds)
+        print(f"{template:<40}{old * 1000:>14.2f}{new * 1000:>14.2f}{old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
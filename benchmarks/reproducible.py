@@ -0,0 +1,78 @@
+"""Compile every example twice, in two processes with different hash seeds,
+and check that the outputs are byte for byte the same.
+
+    python -m benchmarks.reproducible
+
+A fresh process per compile catches what a second compile in the same
+process can't: ids from a random source and anything that follows the
+iteration order of a set of strings. The exit status is 1 on any difference.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+from templ.engine import Engine
+
+TEMPLATES = sorted(glob.glob("./examples/**/*.pytempl", recursive=True))
+
+CONFIGURATIONS = [
+    {"backend": backend, "autoescape": autoescape}
+    for backend in ["concat", "join", "stream"]
+    for autoescape in [False, True]
+] + [
+    {"profile": "dev"},
+    {"instrument": True},
+    {"extract_styles": True},
+]
+
+SEEDS = ["1", "2"]
+
+
+def digests() -> Dict[str, str]:
+    results = {}
+    for configuration in CONFIGURATIONS:
+        engine = Engine(**configuration)
+        for template in TEMPLATES:
+            with open(template, "r") as template_file:
+                output, _ = engine.compile(template_file.read(), filename=template)
+            digest = hashlib.sha256(output.encode()).hexdigest()
+            results[f"{template} {json.dumps(configuration)}"] = digest
+    return results
+
+
+def compile_in_subprocess(seed: str) -> Dict[str, str]:
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.reproducible", "--digests"],
+        env={**os.environ, "PYTHONHASHSEED": seed},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def main(argv: List[str] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv == ["--digests"]:
+        print(json.dumps(digests()))
+        return 0
+
+    first, *others = [compile_in_subprocess(seed) for seed in SEEDS]
+    differences = [
+        case
+        for case, digest in first.items()
+        if any(other.get(case) != digest for other in others)
+    ]
+    for case in differences:
+        print(f"differs: {case}")
+    print(f"{len(first)} compiles, {len(differences)} differ")
+    return 1 if differences else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
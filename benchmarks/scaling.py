@@ -0,0 +1,77 @@
+import time
+
+from templ.engine import Engine
+
+SIZES = [1_000, 10_000, 100_000]
+
+# ten elements per row: static markup, interpolations, a branch, a loop and a
+# component call with a slot, so every transformer rule shows up in the profile
+row = """
+      <tr class="row">
+        <td>{{ item["id"] }}</td>
+        <td><a href={{ item["url"] }}>{{ item["name"] }}</a></td>
+        if item["done"] {
+          <td><span class="done">done</span></td>
+        } else {
+          <td><span class="todo">todo</span></td>
+        }
+        for tag in {{ item["tags"] }} {
+          <td><em>{{ tag }}</em></td>
+        }
+        @Badge({"label": "new"}) { <b>!</b> }
+      </tr>"""
+
+ELEMENTS_PER_ROW = 10
+
+
+def template(elements: int) -> str:
+    rows = "".join(row for _ in range(elements // ELEMENTS_PER_ROW))
+    return f"""
+component Badge(props) {{
+  <template>
+    <span class="badge">{{{{ props["label"] }}}} @slot()</span>
+  </template>
+}}
+
+component Page(item) {{
+  <template>
+    <table>{rows}
+    </table>
+  </template>
+}}
+"""
+
+
+def measure(engine: Engine, content: str, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        output, _ = engine.compile(content, format=False, minify=False)
+        # the generated module has to get through CPython's compiler as well
+        compile(output, "<page>", "exec")
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main(tolerance: float = 2.0):
+    engine = Engine()
+    # build the parser outside the measured region
+    engine.compile(template(ELEMENTS_PER_ROW), format=False, minify=False)
+
+    print(f"{'elements':>10}{'compile (ms)':>16}{'per element (us)':>20}")
+    per_element = []
+    for size in SIZES:
+        elapsed = measure(engine, template(size), rounds=5 if size < 100_000 else 1)
+        per_element.append(elapsed / size)
+        print(f"{size:>10}{elapsed * 1000:>16.1f}{elapsed / size * 1e6:>20.2f}")
+
+    # linear means the cost of one element doesn't depend on how many others
+    # there are; some slack is left for cache effects and the allocator
+    growth = per_element[-1] / per_element[0]
+    print(f"per-element cost grew {growth:.2f}x from {SIZES[0]} to {SIZES[-1]}")
+    assert growth < tolerance, f"compile time is superlinear ({growth:.2f}x)"
+
+
+if __name__ == "__main__":
+    main()
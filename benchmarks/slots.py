@@ -0,0 +1,138 @@
+"""Render a 10k-row list of slotted components with and without call
+optimisations, reporting time and the closures created per render.
+
+    python -m benchmarks.slots
+"""
+
+import dataclasses
+import dis
+import sys
+import time
+from typing import Callable
+
+from benchmarks._util import load
+from templ.engine import Engine
+
+ROWS = 10_000
+
+TEMPLATE = """
+component Badge(label) {
+  <template>
+    <span class="badge">{{ label }}</span>
+  </template>
+}
+
+component Card(title) {
+  <template>
+    <div class="card"><h2>{{ title }}</h2>@slot()</div>
+  </template>
+}
+
+component Rows(rows) {
+  <template>
+    <ul>
+      for row in rows {
+        <li>
+          @Badge({{ row }})
+          @Card({{ row }}) { <p>Nothing here depends on the row.</p> }
+        </li>
+      }
+    </ul>
+  </template>
+}
+"""
+
+# leaves whose expressions bind the name their caller passes in: inlining
+# must not let the comprehension, lambda or walrus capture the argument
+CAPTURE = """
+component Comprehension(i) {
+  <template><p>{{ str([x + i for x in range(2)]) }}</p></template>
+}
+
+component Lambda(i) {
+  <template><p>{{ str((lambda x: x + i)(1)) }}</p></template>
+}
+
+component Walrus(i) {
+  <template><p>{{ str([(x := 1) + i][0]) }}</p></template>
+}
+
+component Page(x) {
+  <template>
+    <div>@Comprehension({{ x }}) @Lambda({{ x }}) @Walrus({{ x }})</div>
+  </template>
+}
+"""
+
+MAKE_FUNCTION = dis.opmap["MAKE_FUNCTION"]
+
+
+def table(backend: str, optimize_calls: bool) -> Callable:
+    engine = Engine(backend=backend)
+    engine.profile = dataclasses.replace(engine.profile, optimize_calls=optimize_calls)
+    return load(engine, TEMPLATE)["Rows"]
+
+
+def check():
+    for backend in ["concat", "join", "stream"]:
+        rendered = set()
+        for profile in ["dev", "prod"]:
+            page = load(Engine(backend=backend, profile=profile), CAPTURE)["Page"]
+            rendered.add(render(page, 10))
+        assert len(rendered) == 1, f"{backend}: inlining changed the output"
+
+
+def render(component: Callable, rows) -> str:
+    result = component(rows)
+    return result if isinstance(result, str) else "".join(result)
+
+
+def closures(component: Callable, rows) -> int:
+    """MAKE_FUNCTION opcodes executed during one render: every lambda or
+    nested function the generated code creates."""
+    count = 0
+
+    def trace(frame, event, arg):
+        nonlocal count
+        frame.f_trace_opcodes = True
+        if event == "opcode" and frame.f_code.co_code[frame.f_lasti] == MAKE_FUNCTION:
+            count += 1
+        return trace
+
+    sys.settrace(trace)
+    try:
+        render(component, rows)
+    finally:
+        sys.settrace(None)
+    return count
+
+
+def best(component: Callable, rows, repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(component, rows)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    check()
+
+    rows = [f"row {i}" for i in range(ROWS)]
+    print(f"{'backend':<10}{'optimised':>10}{'time (ms)':>12}{'closures':>10}")
+    for backend in ["concat", "join", "stream"]:
+        rendered = set()
+        for optimize_calls in [False, True]:
+            component = table(backend, optimize_calls)
+            rendered.add(render(component, rows))
+            print(
+                f"{backend:<10}{str(optimize_calls):>10}"
+                f"{best(component, rows) * 1000:>12.2f}"
+                f"{closures(component, rows):>10}"
+            )
+        assert len(rendered) == 1, f"{backend}: output changed with optimize_calls"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Render a page with 200 instances of a styled component, with inline
+<style> blocks and with extracted styles, reporting page size and time.
+
+    python -m benchmarks.styles
+"""
+
+import time
+from typing import Callable
+
+from benchmarks._util import load
+from templ.engine import Engine
+from templ.styles import collect
+
+INSTANCES = 200
+
+TEMPLATE = """
+component Card(title) {
+  <style>
+    .card { border: 1px solid #ddd; border-radius: 4px; padding: 12px; margin: 8px 0; }
+    .card h2 { font-size: 1.2em; margin: 0 0 8px; color: #333; }
+    .card p { color: #666; line-height: 1.4; }
+  </style>
+  <template>
+    <div class="card"><h2>{{ title }}</h2><p>Body</p></div>
+  </template>
+}
+
+component Page(titles) {
+  <template>
+    <main>
+      for title in titles {
+        @Card({{ title }})
+      }
+    </main>
+  </template>
+}
+"""
+
+
+def page(extract_styles: bool) -> Callable:
+    return load(Engine(extract_styles=extract_styles), TEMPLATE)["Page"]
+
+
+def best(run: Callable[[], str], repeat: int = 50) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    titles = [f"Card {i}" for i in range(INSTANCES)]
+    inline, extracted = page(False), page(True)
+
+    def render_extracted() -> str:
+        with collect():
+            return extracted(titles)
+
+    print(f"{'styles':<12}{'page (bytes)':>14}{'time (ms)':>12}")
+    for name, run in [
+        ("inline", lambda: inline(titles)),
+        ("extracted", render_extracted),
+    ]:
+        print(f"{name:<12}{len(run()):>14}{best(run) * 1000:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
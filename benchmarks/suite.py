@@ -0,0 +1,304 @@
+"""Compile and render benchmarks with JSON output.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --output new.json --baseline results.json
+
+With --baseline, every case is compared to the same case in the baseline file.
+The exit status is 1 if any case got slower than --threshold allows.
+"""
+
+import argparse
+import datetime
+import gc
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+from benchmarks._util import load
+from benchmarks.scaling import template as synthetic_template
+from templ.engine import Engine
+from templ.timing import Timings
+
+COMPILE_CASES = {
+    **{
+        os.path.normpath(path): path
+        for path in sorted(glob.glob("./examples/**/*.pytempl", recursive=True))
+    },
+    "synthetic-1k": synthetic_template(1_000),
+}
+
+COMPILE_PHASES = ["parse", "transform", "format", "minify"]
+
+# each render case is a template, the component to render and its arguments
+NESTING = "\n".join(
+    [
+        """
+component Level0() {
+  <template>
+    <span>leaf</span>
+  </template>
+}
+"""
+    ]
+    + [
+        f"""
+component Level{depth}() {{
+  <template>
+    <div class="level-{depth}">
+      @Level{depth - 1}()
+      @Wrap() {{ <em>{depth}</em> }}
+    </div>
+  </template>
+}}
+"""
+        for depth in range(1, 21)
+    ]
+    + [
+        """
+component Wrap() {
+  <template>
+    <section>@slot()</section>
+  </template>
+}
+"""
+    ]
+)
+
+LOOP = """
+component Rows(rows) {
+  <template>
+    <table>
+      for row in rows {
+        <tr><td>{{ row["id"] }}</td><td>{{ row["name"] }}</td></tr>
+      }
+    </table>
+  </template>
+}
+"""
+
+CONDITIONALS = """
+component Statuses(codes) {
+  <template>
+    <ul>
+      for code in codes {
+        if code == 0 {
+          <li class="ok">ok</li>
+        } elif code == 1 {
+          <li class="warn">warning</li>
+        } elif code == 2 {
+          <li class="error">error</li>
+        } elif code == 3 {
+          <li class="fatal">fatal</li>
+        } else {
+          <li>unknown</li>
+        }
+      }
+    </ul>
+  </template>
+}
+"""
+
+ATTRIBUTES = """
+component Inputs(fields) {
+  <template>
+    <form method="post" action="/submit" class="form" novalidate>
+      for field in fields {
+        <input type="text" id={{ field["id"] }} name={{ field["name"] }} value={{ field["value"] }} class="input" title="text" required autocomplete="off"/>
+      }
+    </form>
+  </template>
+}
+"""
+
+RENDER_CASES = {
+    "nesting-20": (NESTING, "Level20", ()),
+    "loop-10k": (
+        LOOP,
+        "Rows",
+        ([{"id": str(i), "name": f"row {i}"} for i in range(10_000)],),
+    ),
+    "conditionals-1k": (CONDITIONALS, "Statuses", ([i % 5 for i in range(1_000)],)),
+    "attributes-1k": (
+        ATTRIBUTES,
+        "Inputs",
+        (
+            [
+                {"id": f"f{i}", "name": f"field{i}", "value": str(i)}
+                for i in range(1_000)
+            ],
+        ),
+    ),
+}
+
+BACKENDS = ["concat", "join", "stream"]
+
+
+def measure(run: Callable[[], None], repeat: int, min_time: float) -> List[float]:
+    """Seconds per call, one sample per repeat. Each sample runs `run` enough
+    times to last at least `min_time`, so fast cases aren't timer noise."""
+    start = time.perf_counter()
+    run()
+    number = max(1, int(min_time / max(time.perf_counter() - start, 1e-9)))
+
+    # like timeit, collections are kept out of the measurement: when they run
+    # depends on everything allocated before, not on the case itself
+    samples = []
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                run()
+            samples.append((time.perf_counter() - start) / number)
+    finally:
+        gc.enable()
+    return samples
+
+
+def summary(samples: List[float]) -> Dict[str, float]:
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "rounds": len(samples),
+    }
+
+
+def compile_benchmarks(repeat: int) -> Dict[str, Dict[str, float]]:
+    engine = Engine()
+    results = {}
+    for name, source in COMPILE_CASES.items():
+        content = source
+        if source.endswith(".pytempl"):
+            with open(source, "r") as template_file:
+                content = template_file.read()
+
+        # one full compile per round, split into its phases by the engine's
+        # own timings
+        samples: Dict[str, List[float]] = {phase: [] for phase in COMPILE_PHASES}
+        engine.compile(content, format=True, minify=True)
+        for _ in range(repeat):
+            timings = Timings()
+            engine.compile(content, format=True, minify=True, timings=timings)
+            for phase in COMPILE_PHASES:
+                samples[phase].append(timings.seconds[phase])
+
+        for phase in COMPILE_PHASES:
+            results[f"compile/{name}/{phase}"] = summary(samples[phase])
+    return results
+
+
+def render_benchmarks(repeat: int, min_time: float) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, (content, component_name, args) in RENDER_CASES.items():
+        for backend in BACKENDS:
+            component = load(Engine(backend=backend), content)[component_name]
+            if backend == "stream":
+                run = lambda: "".join(component(*args))
+            else:
+                run = lambda: component(*args)
+            results[f"render/{name}/{backend}"] = summary(
+                measure(run, repeat, min_time)
+            )
+    return results
+
+
+def metadata() -> Dict[str, str]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = ""
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+) -> List[str]:
+    """Print each case against the baseline and return the ones that regressed."""
+    regressions = []
+    print(f"{'case':<60}{'baseline (ms)':>15}{'current (ms)':>15}{'change':>10}")
+    for case, result in results.items():
+        if case not in baseline:
+            print(f"{case:<60}{'-':>15}{result['min'] * 1000:>15.3f}{'new':>10}")
+            continue
+
+        # the fastest round is the one least disturbed by the rest of the
+        # machine, so that's what's compared
+        before = baseline[case]["min"]
+        change = result["min"] / before - 1 if before else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(case)
+            flag = "  <- slower"
+        print(
+            f"{case:<60}{before * 1000:>15.3f}{result['min'] * 1000:>15.3f}"
+            f"{change:>+10.1%}{flag}"
+        )
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="slowdown that counts as a regression (default 0.10 = 10%%)",
+    )
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05)
+    parser.add_argument("--only", choices=["compile", "render"])
+    args = parser.parse_args(argv)
+
+    results = {}
+    if args.only != "render":
+        results.update(compile_benchmarks(args.repeat))
+    if args.only != "compile":
+        results.update(render_benchmarks(args.repeat, args.min_time))
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(
+                {"metadata": metadata(), "results": results},
+                output_file,
+                indent=2,
+                sort_keys=True,
+            )
+
+    if args.baseline:
+        with open(args.baseline, "r") as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than the baseline")
+            return 1
+        return 0
+
+    print(f"{'case':<60}{'median (ms)':>15}{'min (ms)':>15}")
+    for case, result in results.items():
+        print(
+            f"{case:<60}{result['median'] * 1000:>15.3f}{result['min'] * 1000:>15.3f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+POSTS = [
+    {
+        "slug": "hello-world",
+        "title": "Hello, world",
+        "body": "The first post of the blog.",
+    },
+    {
+        "slug": "dynamic-routes",
+        "title": "Dynamic routes",
+        "body": "One template, one page per entry of paths().",
+    },
+]
+
+
+def paths():
+    # each entry is the keyword arguments of one page's Page()
+    for post in POSTS:
+        yield {"slug": post["slug"], "post": post}
@@ -1 +1,14 @@
-from .engine import *
+import importlib
+
+
+def __getattr__(name: str):
+    # generated modules import their helpers from this package, so the
+    # compiler, and lark with it, is only loaded once something asks for it
+    engine = importlib.import_module("templ.engine")
+    try:
+        return getattr(engine, name)
+    except AttributeError:
+        raise AttributeError(f"module 'templ' has no attribute {name!r}") from None
+
+
+__all__ = ["BuildError", "Engine", "Rebuild", "TemplateError"]
@@ -0,0 +1,5 @@
+import sys
+
+from templ.cli import main
+
+sys.exit(main())
@@ -0,0 +1,124 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import urllib.parse
+import urllib.request
+from typing import Dict, List, Optional
+
+from templ.manifest import content_hash
+from templ.pages import write_file
+
+VENDOR_DIRECTORY = "vendor"
+# what each vendored requirement was downloaded as, so later builds don't
+# need the network or pick up a newer release
+VENDOR_INDEX = "vendor.json"
+
+
+class AssetError(Exception):
+    pass
+
+
+def asset_name(name: str, content: str, extension: str) -> str:
+    # named after the content, so a changed asset is a new URL and browsers
+    # can cache every version for good
+    return f"{name}.{content_hash(content)[:12]}.{extension}"
+
+
+def asset_url(base_url: str, *parts: str) -> str:
+    return "/".join([base_url.rstrip("/"), *parts])
+
+
+def write_assets(
+    directory: str, assets: Dict[str, str], precompress: Optional[int] = None
+) -> List[str]:
+    """Write each asset that isn't there yet and return all of their paths.
+    A file with the same name already has the same content."""
+    paths = []
+    for file_name, content in assets.items():
+        path = os.path.join(directory, file_name)
+        if not os.path.exists(path) or (
+            precompress is not None and not os.path.exists(f"{path}.gz")
+        ):
+            write_file(path, [content], precompress=precompress)
+        paths.append(path)
+    return paths
+
+
+def _download(requirement: str, directory: str) -> str:
+    if urllib.parse.urlparse(requirement).scheme in ("http", "https"):
+        file_name = os.path.basename(urllib.parse.urlparse(requirement).path)
+        with urllib.request.urlopen(requirement) as response:
+            with open(os.path.join(directory, file_name), "wb") as output_file:
+                shutil.copyfileobj(response, output_file)
+        return file_name
+
+    # the browser runs pure Python wheels only, whatever this machine is
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "pip",
+            "download",
+            "--no-deps",
+            "--only-binary=:all:",
+            "--platform=any",
+            "--dest",
+            directory,
+            requirement,
+        ],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise AssetError(lines[-1] if lines else f"pip download {requirement} failed")
+    [file_name] = os.listdir(directory)
+    return file_name
+
+
+def vendor(requirements: List[str], directory: str) -> List[str]:
+    """Download each of `requirements`, a package requirement or a wheel's
+    URL, into `directory/vendor` unless it was already, and return the file
+    names in the same order."""
+    vendor_directory = os.path.join(directory, VENDOR_DIRECTORY)
+    index_path = os.path.join(vendor_directory, VENDOR_INDEX)
+    index: Dict[str, str] = {}
+    if os.path.exists(index_path):
+        with open(index_path, "r") as index_file:
+            index = json.load(index_file)
+
+    os.makedirs(vendor_directory, exist_ok=True)
+    for requirement in requirements:
+        file_name = index.get(requirement)
+        if file_name and os.path.exists(os.path.join(vendor_directory, file_name)):
+            continue
+        # downloaded next to where it goes and renamed into place, so build
+        # workers vendoring at the same time never see half a file
+        with tempfile.TemporaryDirectory(dir=vendor_directory) as download_directory:
+            try:
+                file_name = _download(requirement, download_directory)
+            except (OSError, ValueError) as e:
+                raise AssetError(f"{requirement}: {e}") from None
+            os.replace(
+                os.path.join(download_directory, file_name),
+                os.path.join(vendor_directory, file_name),
+            )
+        index[requirement] = file_name
+
+    temporary = f"{index_path}.{os.getpid()}"
+    with open(temporary, "w") as index_file:
+        json.dump(index, index_file, indent=2, sort_keys=True)
+    os.replace(temporary, index_path)
+    return [index[requirement] for requirement in requirements]
+
+
+__all__ = [
+    "AssetError",
+    "asset_name",
+    "asset_url",
+    "vendor",
+    "write_assets",
+]
@@ -1,8 +1,26 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List
 
+from templ.ast.markup import Node, Text
+
 
 @dataclass
 class ComponentDirective:
     name: str
     value: List[str]
+
+
+@dataclass
+class Component:
+    name: str
+    params: List[str]
+    python_code: str
+    markup: List["Node"]
+    directives: List[ComponentDirective] = field(default_factory=list)
+    is_async: bool = False
+
+    @property
+    def is_static(self) -> bool:
+        return not self.python_code.strip() and all(
+            isinstance(node, Text) for node in self.markup
+        )
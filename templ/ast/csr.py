@@ -1,11 +1,12 @@
+import json
 from dataclasses import dataclass
 from string import Template
-from typing import List, Literal, Union
+from typing import List, Literal, Optional, Union
 
 csr_template = Template(
     """
 def $name():
-    return "\\n".join([
+    $keyword "\\n".join([
     '<div id="$id">',
     '<link rel="stylesheet" href="https://pyscript.net/releases/2025.8.1/core.css">',
     '<script type="module" src="https://pyscript.net/releases/2025.8.1/core.js"></script>',
@@ -20,6 +21,31 @@ def $name():
 """
 )
 
+PYSCRIPT_LOADER = (
+    '<link rel="stylesheet" href="https://pyscript.net/releases/2025.8.1/core.css">'
+    '<script type="module" src="https://pyscript.net/releases/2025.8.1/core.js"></script>'
+)
+
+# with `Engine(csr_assets=...)`, an instance is only its placeholder. The
+# loader and the component's script come once per page, and the script
+# mounts every placeholder at once
+csr_asset_template = Template(
+    """
+def $name():
+    $keyword '<div data-pytempl="$name"></div>' + _once('pyscript', $loader) + _once($key, $script)
+"""
+)
+
+csr_module_template = Template(
+    """import pyscript as js
+$python_code
+js.window.$name = $name
+_elements = js.document.querySelectorAll('[data-pytempl="$name"]')
+for _i in range(_elements.length):
+    _elements[_i].outerHTML = $name()
+"""
+)
+
 
 @dataclass
 class CSRComponent:
@@ -28,12 +54,34 @@ class CSRComponent:
     content: str
     packages: List[str]
     interpreter: Union[Literal["mpy"] | Literal["py"]] = "mpy"
+    stream: bool = False
+    # where the module() is served from, when it isn't inlined
+    src: Optional[str] = None
+
+    def module(self) -> str:
+        return csr_module_template.substitute(
+            name=self.name, python_code=self.content.strip()
+        )
 
     def render(self):
+        if self.src is not None:
+            config = json.dumps({"packages": self.packages})
+            script = (
+                f'<script type="{self.interpreter}" src="{self.src}" '
+                f"config='{config}'></script>"
+            )
+            return csr_asset_template.substitute(
+                name=self.name,
+                keyword="yield" if self.stream else "return",
+                loader=repr(PYSCRIPT_LOADER),
+                key=repr(self.id),
+                script=repr(script),
+            )
         return csr_template.substitute(
             id=self.id,
             name=self.name,
             python_code=self.content,
             interpreter=self.interpreter,
             packages=self.packages,
+            keyword="yield" if self.stream else "return",
         )
@@ -0,0 +1,101 @@
+from dataclasses import dataclass, field
+from typing import ClassVar, Dict, List, Optional, Union
+
+# Facts like `uses_slot` are worked out once, when a node is built from its
+# already built children, so asking a body about them never walks the tree.
+
+
+@dataclass
+class Text:
+    value: str
+
+    uses_slot: ClassVar[bool] = False
+
+
+@dataclass
+class Expr:
+    code: str
+    # already markup, so autoescape leaves it alone
+    safe: bool = False
+
+    uses_slot: ClassVar[bool] = False
+
+
+@dataclass
+class Call:
+    name: str
+    args: List[str] = field(default_factory=list)
+    slot: Optional[List["Node"]] = None
+    # a module level function passed as the slot in place of `slot`'s lambda
+    slot_ref: Optional[str] = None
+    # "file:line" of the call in its template, and whether it's timed
+    location: Optional[str] = field(default=None, compare=False)
+    profiled: bool = field(default=False, compare=False)
+    uses_slot: bool = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.uses_slot = self.name == "slot" or (
+            self.slot is not None and uses_slot(self.slot)
+        )
+
+
+@dataclass
+class Branch:
+    condition: Optional[str]
+    body: List["Node"]
+    uses_slot: bool = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.uses_slot = uses_slot(self.body)
+
+
+@dataclass
+class If:
+    branches: List[Branch]
+    uses_slot: bool = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.uses_slot = any(branch.uses_slot for branch in self.branches)
+
+
+@dataclass
+class For:
+    target: str
+    iterable: str
+    body: List["Node"]
+    location: Optional[str] = field(default=None, compare=False)
+    profiled: bool = field(default=False, compare=False)
+    uses_slot: bool = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.uses_slot = uses_slot(self.body)
+
+
+Node = Union[Text, Expr, Call, If, For]
+
+
+def children(node: Node) -> List[List[Node]]:
+    if isinstance(node, Call):
+        return [node.slot] if node.slot is not None else []
+    if isinstance(node, If):
+        return [branch.body for branch in node.branches]
+    if isinstance(node, For):
+        return [node.body]
+    return []
+
+
+def uses_slot(nodes: List[Node]) -> bool:
+    return any(node.uses_slot for node in nodes)
+
+
+def calls(nodes: List[Node]) -> List[str]:
+    # in the order they're found, not a set's: the passes that follow calls
+    # mustn't depend on string hashing, which changes from run to run
+    names: Dict[str, None] = {}
+    stack = [nodes]
+    while stack:
+        for node in stack.pop():
+            if isinstance(node, Call):
+                names[node.name] = None
+            stack.extend(children(node))
+    return list(names)
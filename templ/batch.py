@@ -0,0 +1,103 @@
+import asyncio
+import contextvars
+import importlib
+import inspect
+import itertools
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Optional
+
+from templ.lazy import LazyComponent
+from templ.styles import collect
+
+Props = Any
+
+
+def _chunks(props: Iterable[Props], size: int) -> Iterator[List[Props]]:
+    items = iter(props)
+    return iter(lambda: list(itertools.islice(items, size)), [])
+
+
+def _render_all(
+    component: Callable, props: Iterable[Props], unpack: bool, chunk_size: int
+) -> Iterator[str]:
+    # one event loop serves every async render of the batch, and is only
+    # started once a render needs one
+    runner: Optional[asyncio.Runner] = None
+    try:
+        for chunk in _chunks(props, chunk_size):
+            rendered = []
+            # each render gets its own stylesheets. Entering collect() costs
+            # about as much as a small render, so a chunk shares one and
+            # clears it in between; nothing is yielded while it's active
+            with collect() as styles:
+                for item in chunk:
+                    styles.sheets.clear()
+                    styles.emitted.clear()
+                    output = component(**item) if unpack else component(item)
+                    if inspect.iscoroutine(output):
+                        if runner is None:
+                            runner = asyncio.Runner()
+                        # the runner's own context predates collect()
+                        output = runner.run(output, context=contextvars.copy_context())
+                    if not isinstance(output, str):
+                        output = "".join(output)
+                    rendered.append(output)
+            yield from rendered
+    finally:
+        if runner is not None:
+            runner.close()
+
+
+def _render_chunk(
+    module: str, name: str, chunk: List[Props], unpack: bool
+) -> List[str]:
+    # runs in a worker, which keeps the module imported from one chunk to
+    # the next
+    component = getattr(importlib.import_module(module), name)
+    return list(_render_all(component, chunk, unpack, len(chunk)))
+
+
+def render_many(
+    component: Callable,
+    props: Iterable[Props],
+    unpack: bool = False,
+    workers: int = 1,
+    chunk_size: int = 256,
+) -> Iterator[str]:
+    """Render `component` once for each item of `props`, yielding the HTML
+    in the same order. Each item is passed as the component's one argument,
+    or as its keyword arguments with `unpack=True`, like a page's params.
+
+    Stream and async components are rendered to strings as well, and
+    extracted styles are emitted once per render. Items are rendered
+    `chunk_size` at a time, and with `workers > 1` the chunks are spread over
+    a process pool. `props` is read as chunks are needed, and at most two
+    chunks per worker are queued or waiting to be yielded, so memory doesn't
+    grow with its length. Workers import the component by name, so it must
+    be defined at the top level of an importable module."""
+    if isinstance(component, LazyComponent):
+        component = component.resolve()
+    if workers <= 1:
+        yield from _render_all(component, props, unpack, chunk_size)
+        return
+
+    module, name = component.__module__, component.__qualname__
+    if "." in name:
+        raise ValueError(f"{name} isn't defined at the top level of {module}")
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending: Deque[Future] = deque()
+    try:
+        for chunk in _chunks(props, chunk_size):
+            pending.append(executor.submit(_render_chunk, module, name, chunk, unpack))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        # a consumer that stops early doesn't wait for chunks it won't read
+        executor.shutdown(cancel_futures=True)
+
+
+__all__ = ["render_many"]
@@ -0,0 +1,195 @@
+import functools
+import hashlib
+import inspect
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+def freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, set):
+        return frozenset(freeze(v) for v in value)
+    return value
+
+
+def digest(key: Hashable) -> str:
+    """A stable string form of a cache key, for backends shared between processes."""
+    return hashlib.sha256(repr(key).encode()).hexdigest()
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[str]: ...
+
+    @abstractmethod
+    def set(self, key: Hashable, value: str): ...
+
+    @abstractmethod
+    def delete(self, key: Hashable): ...
+
+    @abstractmethod
+    def clear(self): ...
+
+
+class MemoryCache(CacheBackend):
+    def __init__(self, maxsize: Optional[int] = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires, value = entry
+            if self.ttl is not None and expires < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: str):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else 0.0
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ComponentCache:
+    def __init__(self, component: Callable, backend: CacheBackend):
+        self.component = component
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.streaming = inspect.isgeneratorfunction(component)
+        self.accepts_slot = "slot" in inspect.signature(component).parameters
+
+    def key(self, args: tuple, kwargs: Dict[str, Any]) -> Optional[Hashable]:
+        """None when the props can't be made into a key, e.g. unhashable
+        objects or dicts whose keys don't sort. Those calls aren't cached."""
+        try:
+            key = (
+                self.component.__module__,
+                self.component.__qualname__,
+                freeze(args),
+                freeze(kwargs),
+            )
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _render(self, output) -> str:
+        return output if isinstance(output, str) else "".join(output)
+
+    def _replay(self, output: str) -> Callable:
+        return (lambda: (output,)) if self.streaming else (lambda: output)
+
+    def _lookup(self, args: tuple, kwargs: Dict[str, Any]):
+        # slot callables are new on every call, so the key uses what they render
+        slot_position = None
+        if self.accepts_slot and "slot" in kwargs:
+            kwargs["slot"] = self._render(kwargs["slot"]())
+            slot_position = "slot"
+        elif self.accepts_slot and args and callable(args[-1]):
+            args = (*args[:-1], self._render(args[-1]()))
+            slot_position = -1
+
+        key = self.key(args, kwargs)
+        value = self.backend.get(key) if key is not None else None
+        if value is not None:
+            self.hits += 1
+            return key, value, args, kwargs
+
+        self.misses += 1
+        if slot_position == "slot":
+            kwargs["slot"] = self._replay(kwargs["slot"])
+        elif slot_position == -1:
+            args = (*args[:-1], self._replay(args[-1]))
+
+        return key, None, args, kwargs
+
+    def __call__(self, *args, **kwargs) -> str:
+        key, value, args, kwargs = self._lookup(args, kwargs)
+        if value is None:
+            value = self._render(self.component(*args, **kwargs))
+            if key is not None:
+                self.backend.set(key, value)
+        return value
+
+    async def call_async(self, *args, **kwargs) -> str:
+        key, value, args, kwargs = self._lookup(args, kwargs)
+        if value is None:
+            value = await self.component(*args, **kwargs)
+            if key is not None:
+                self.backend.set(key, value)
+        return value
+
+    def invalidate(self, *args, **kwargs):
+        key = self.key(args, kwargs)
+        if key is not None:
+            self.backend.delete(key)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def cache(
+    ttl: Optional[float] = None,
+    maxsize: Optional[int] = 1024,
+    backend: Optional[CacheBackend] = None,
+):
+    def decorator(component: Callable):
+        component_cache = ComponentCache(
+            component, backend or MemoryCache(maxsize, ttl)
+        )
+
+        if component_cache.streaming:
+
+            @functools.wraps(component)
+            def wrapper(*args, **kwargs):
+                yield component_cache(*args, **kwargs)
+
+        elif inspect.iscoroutinefunction(component):
+
+            @functools.wraps(component)
+            async def wrapper(*args, **kwargs):
+                return await component_cache.call_async(*args, **kwargs)
+
+        else:
+
+            @functools.wraps(component)
+            def wrapper(*args, **kwargs):
+                return component_cache(*args, **kwargs)
+
+        wrapper.cache = component_cache
+        return wrapper
+
+    return decorator
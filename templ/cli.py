@@ -0,0 +1,176 @@
+import argparse
+import sys
+from typing import List, Optional
+
+from templ.engine import BuildError, Engine
+from templ.importtime import ImportTimeError, measure, report
+from templ.profiles import PROFILES
+
+
+def _engine(args: argparse.Namespace, profile: str) -> Engine:
+    return Engine(
+        backend=args.backend,
+        autoescape=args.autoescape,
+        profile=args.profile or profile,
+        instrument=args.instrument,
+        extract_styles=args.extract_styles,
+        reproducible=args.reproducible,
+        precompress=args.precompress,
+        lazy_imports=args.lazy_imports,
+        csr_assets=args.csr_assets,
+        csr_assets_url=args.csr_assets_url,
+        minify_html=args.minify_html,
+    )
+
+
+def _report_errors(error: BuildError):
+    for template, template_error in error.errors.items():
+        print(f"error: {template}: {template_error}", file=sys.stderr)
+
+
+def build(args: argparse.Namespace) -> int:
+    engine = _engine(args, "prod")
+    try:
+        if args.ssg:
+            timings = engine.ssg(
+                args.template_dir,
+                incremental=not args.full,
+                workers=args.workers,
+                batch_size=args.batch_size,
+            )
+        else:
+            timings = engine.ssr(
+                args.template_dir, incremental=not args.full, workers=args.workers
+            )
+    except BuildError as e:
+        _report_errors(e)
+        return 1
+
+    if args.timings:
+        print(timings.report())
+    return 0
+
+
+def watch(args: argparse.Namespace) -> int:
+    # dev by default: formatting and minifying dominate an edit-to-output loop
+    engine = _engine(args, "dev")
+    print(f"watching {args.template_dir} (Ctrl+C to stop)")
+    try:
+        for rebuild in engine.watch(args.template_dir, args.ssg, args.interval):
+            if rebuild.error is not None:
+                _report_errors(rebuild.error)
+            print(
+                f"rebuilt {len(rebuild.modified)} modified template(s) "
+                f"in {rebuild.seconds * 1000:.1f} ms"
+            )
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def imports(args: argparse.Namespace) -> int:
+    try:
+        times = measure(args.module)
+    except ImportTimeError as e:
+        print(f"error: {args.module}: {e}", file=sys.stderr)
+        return 1
+    print(report(times, limit=args.limit, templates_only=not args.all))
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="pytempl", description="Compile .pytempl templates to Python."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_command = commands.add_parser("build", help="compile a template directory")
+    build_command.add_argument("--workers", type=int, default=1)
+    build_command.add_argument(
+        "--batch-size",
+        type=int,
+        default=256,
+        help="pages of a dynamic route rendered per worker job",
+    )
+    build_command.add_argument(
+        "--full", action="store_true", help="ignore the manifest and rebuild all"
+    )
+    build_command.add_argument(
+        "--timings", action="store_true", help="print time spent in each phase"
+    )
+    build_command.set_defaults(run=build)
+
+    watch_command = commands.add_parser(
+        "watch", help="rebuild templates as they change"
+    )
+    watch_command.add_argument(
+        "--interval", type=float, default=0.05, help="seconds between polls"
+    )
+    watch_command.set_defaults(run=watch)
+
+    imports_command = commands.add_parser(
+        "imports", help="report which templates cost the most to import"
+    )
+    imports_command.add_argument("module", help="e.g. app.pages.index")
+    imports_command.add_argument("--limit", type=int, default=20)
+    imports_command.add_argument(
+        "--all", action="store_true", help="list every module, not just templates"
+    )
+    imports_command.set_defaults(run=imports)
+
+    for command in (build_command, watch_command):
+        command.add_argument("template_dir")
+        command.add_argument(
+            "--ssg", action="store_true", help="also render pages to HTML"
+        )
+        command.add_argument("--profile", choices=sorted(PROFILES))
+        command.add_argument(
+            "--backend", choices=["concat", "join", "stream"], default="concat"
+        )
+        command.add_argument("--autoescape", action="store_true")
+        command.add_argument(
+            "--instrument", action="store_true", help="time every component call"
+        )
+        command.add_argument(
+            "--minify-html",
+            action="store_true",
+            help="collapse whitespace and drop optional quotes and end tags",
+        )
+        command.add_argument(
+            "--extract-styles",
+            action="store_true",
+            help="emit each <style> once per render, or as a CSS bundle with --ssg",
+        )
+        command.add_argument(
+            "--reproducible",
+            action="store_true",
+            help="check that each template compiles to the same bytes twice, "
+            "and leave unchanged outputs untouched",
+        )
+        command.add_argument(
+            "--precompress",
+            type=int,
+            nargs="?",
+            const=9,
+            metavar="LEVEL",
+            help="with --ssg, also write a .gz of every page (zlib level, default 9)",
+        )
+        command.add_argument(
+            "--lazy-imports",
+            action="store_true",
+            help="import components from other modules on first use",
+        )
+        command.add_argument(
+            "--csr-assets",
+            metavar="DIR",
+            help="write client component code and packages to DIR instead of "
+            "inlining them",
+        )
+        command.add_argument(
+            "--csr-assets-url",
+            metavar="URL",
+            help="where DIR is served from (default: /DIR)",
+        )
+
+    args = parser.parse_args(argv)
+    return args.run(args)
@@ -0,0 +1,555 @@
+import ast
+import itertools
+from dataclasses import replace
+from string import Template
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from templ.ast.components import Component
+from templ.ast.markup import Branch, Call, Expr, For, If, Node, Text, calls
+from templ.optimizer import local_names
+from templ.runtime import escape
+
+function_template = Template(
+    """$decorators
+def $name($params):
+    $python_code
+    return ( $markup )
+"""
+)
+
+autoescape_prelude = "from templ.runtime import Markup as _Markup, escape as _escape"
+cache_prelude = "from templ.cache import cache as _cache"
+profiler_prelude = (
+    "from templ.profiler import enter as _enter, leave as _leave, profiled as _profiled"
+)
+async_prelude = "from templ.runtime import gather as _gather, resolve as _resolve"
+styles_prelude = "from templ.styles import style as _style"
+lazy_prelude = "from templ.lazy import lazy as _lazy"
+once_prelude = "from templ.styles import once as _once"
+
+async_template = Template(
+    """$decorators
+async def $name($params):
+    $python_code
+$body
+    return ( $markup )
+"""
+)
+
+generator_template = Template(
+    """$decorators
+def $name($params):
+    $python_code
+$body
+"""
+)
+
+
+def merge_text(nodes: List[Node]) -> List[Node]:
+    merged: List[Node] = []
+    run: List[str] = []
+    for node in nodes:
+        if isinstance(node, Text):
+            # joined once at the end of the run, growing the string one node
+            # at a time is quadratic on large static pages
+            run.append(node.value)
+            continue
+        if run:
+            merged.append(Text("".join(run)))
+            run = []
+        merged.append(node)
+    if run:
+        merged.append(Text("".join(run)))
+    return merged
+
+
+def fold(nodes: List[Node]) -> List[Node]:
+    folded: List[Node] = []
+    for node in nodes:
+        if isinstance(node, Call) and node.slot is not None:
+            node = replace(node, slot=fold(node.slot))
+        elif isinstance(node, If):
+            node = If([Branch(b.condition, fold(b.body)) for b in node.branches])
+        elif isinstance(node, For):
+            node = replace(node, body=fold(node.body))
+        folded.append(node)
+
+    return merge_text(folded)
+
+
+_UNKNOWN = object()
+
+
+def _literal_value(code: str):
+    try:
+        return ast.literal_eval(code)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return _UNKNOWN
+
+
+def escape_markup(nodes: List[Node]) -> List[Node]:
+    escaped: List[Node] = []
+    for node in nodes:
+        if isinstance(node, Expr) and not node.safe:
+            value = _literal_value(node.code)
+
+            # literals are escaped once, here, instead of on every render
+            if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+                node = Text(escape(str(value)))
+            else:
+                node = Expr(f"_escape({node.code})", safe=True)
+        elif isinstance(node, Call) and node.slot is not None:
+            node = replace(node, slot=escape_markup(node.slot))
+        elif isinstance(node, If):
+            node = If(
+                [Branch(b.condition, escape_markup(b.body)) for b in node.branches]
+            )
+        elif isinstance(node, For):
+            node = replace(node, body=escape_markup(node.body))
+        escaped.append(node)
+
+    return escaped
+
+
+def fold_literals(nodes: List[Node], autoescape: bool = False) -> List[Node]:
+    """Constant folding over markup: string literal expressions become text
+    and branches whose condition is a literal are resolved."""
+    folded: List[Node] = []
+    for node in nodes:
+        if isinstance(node, Expr):
+            value = _literal_value(node.code)
+            if isinstance(value, str):
+                node = Text(escape(value) if autoescape else value)
+        elif isinstance(node, Call) and node.slot is not None:
+            node = replace(node, slot=fold_literals(node.slot, autoescape))
+        elif isinstance(node, If):
+            branches: List[Branch] = []
+            for branch in node.branches:
+                condition = branch.condition
+                if condition is not None:
+                    value = _literal_value(condition)
+                    if value is not _UNKNOWN and not value:
+                        continue
+                    if value is not _UNKNOWN:
+                        condition = None
+
+                branches.append(
+                    Branch(condition, fold_literals(branch.body, autoescape))
+                )
+                if condition is None:
+                    break
+
+            if not branches:
+                continue
+            if branches[0].condition is None:
+                folded.extend(branches[0].body)
+                continue
+            node = If(branches)
+        elif isinstance(node, For):
+            node = replace(node, body=fold_literals(node.body, autoescape))
+        folded.append(node)
+
+    return folded
+
+
+def instrument(nodes: List[Node]) -> List[Node]:
+    """Mark every component call and loop in `nodes` to be timed."""
+    instrumented: List[Node] = []
+    for node in nodes:
+        if isinstance(node, Call):
+            slot = instrument(node.slot) if node.slot is not None else None
+            node = replace(node, slot=slot, profiled=True)
+        elif isinstance(node, If):
+            node = If([Branch(b.condition, instrument(b.body)) for b in node.branches])
+        elif isinstance(node, For):
+            node = replace(node, body=instrument(node.body), profiled=True)
+        instrumented.append(node)
+
+    return instrumented
+
+
+def _frame(node: Call | For) -> str:
+    name = (
+        node.name if isinstance(node, Call) else f"for {node.target} in {node.iterable}"
+    )
+    return f"{name!r}, {node.location or '<template>'!r}"
+
+
+def _timed(node: Call | For, code: str) -> str:
+    if not node.profiled:
+        return code
+    return f"_leave(_enter({_frame(node)}), {code})"
+
+
+def _is_literal(code: str) -> bool:
+    return _literal_value(code) is not _UNKNOWN
+
+
+def _inline(
+    nodes: List[Node], static: Dict[str, Component], scope: Set[str]
+) -> List[Node]:
+    inlined: List[Node] = []
+    for node in nodes:
+        if isinstance(node, Call):
+            target = static.get(node.name)
+            if (
+                target is not None
+                and node.name not in scope
+                and node.slot is None
+                and len(node.args) == len(target.params)
+                and all(_is_literal(arg) for arg in node.args)
+            ):
+                inlined.extend(target.markup)
+                continue
+            if node.slot is not None:
+                node = replace(node, slot=_inline(node.slot, static, scope))
+        elif isinstance(node, If):
+            node = If(
+                [
+                    Branch(b.condition, _inline(b.body, static, scope))
+                    for b in node.branches
+                ]
+            )
+        elif isinstance(node, For):
+            body = _inline(node.body, static, scope | {node.target})
+            node = replace(node, body=body)
+        inlined.append(node)
+
+    return inlined
+
+
+def inline_static(components: List[Component]):
+    # a call to a static component with literal arguments renders the same
+    # markup every time, so it's folded into the caller's literal. Callees are
+    # resolved before their callers, since inlining can make the caller static
+    # in turn, which keeps this to one pass over each component
+    candidates = {c.name: c for c in components if not c.directives}
+    static: Dict[str, Component] = {}
+    resolved: Set[str] = set()
+
+    def resolve(component: Component):
+        resolved.add(component.name)
+        for name in calls(component.markup):
+            if name in candidates and name not in resolved:
+                resolve(candidates[name])
+
+        # a parameter, local or loop target by the same name shadows the
+        # static component
+        scope = local_names(component)
+        if scope is not None:
+            component.markup = _inline(component.markup, static, scope)
+        component.markup = fold(component.markup)
+        if component.is_static:
+            static[component.name] = component
+
+    for component in components:
+        if candidates.get(component.name) is not component:
+            component.markup = fold(component.markup)
+        elif component.name not in resolved:
+            resolve(component)
+
+
+# `a + b + c` is a left-nested tree as deep as the chain is long, and
+# CPython's compiler, ruff and python_minifier all walk it recursively. Longer
+# markup is cut into chunks of this many parts that are joined as a list, so
+# the depth, compile time and memory per part stay the same on huge pages
+CHUNK_SIZE = 64
+
+
+def chunked(parts: List[str], combine: Callable[[List[str]], str]) -> str:
+    if len(parts) <= CHUNK_SIZE:
+        return combine(parts)
+
+    chunks = [
+        combine(parts[i : i + CHUNK_SIZE]) for i in range(0, len(parts), CHUNK_SIZE)
+    ]
+    while len(chunks) > CHUNK_SIZE:
+        chunks = [
+            f"''.join([{', '.join(chunks[i : i + CHUNK_SIZE])}])"
+            for i in range(0, len(chunks), CHUNK_SIZE)
+        ]
+    return f"''.join([{', '.join(chunks)}])"
+
+
+def _value(node: Expr) -> str:
+    # every backend renders an expression's str(), like a folded literal.
+    # Safe expressions, escaped ones included, are strings already
+    return node.code if node.safe else f"str({node.code})"
+
+
+def concat(nodes: List[Node]) -> str:
+    parts = [_concat_node(node) for node in nodes]
+    if not parts:
+        return "''"
+    return chunked(parts, "+".join)
+
+
+def _concat_node(node: Node) -> str:
+    if isinstance(node, Text):
+        return repr(node.value)
+
+    if isinstance(node, Expr):
+        return f"({node.code})" if node.safe else _value(node)
+
+    if isinstance(node, Call):
+        args = list(node.args)
+        if node.slot is not None:
+            args.append(f"lambda: {concat(node.slot)}")
+        elif node.slot_ref is not None:
+            args.append(node.slot_ref)
+        return _timed(node, f"{node.name}({', '.join(args)})")
+
+    if isinstance(node, If):
+        # Build the nested conditional expression from right to left
+        result = "''"
+        for branch in reversed(node.branches):
+            if branch.condition is None:
+                result = f"({concat(branch.body)})"
+            else:
+                result = f"({concat(branch.body)} if {branch.condition} else {result})"
+        return result
+
+    if isinstance(node, For):
+        body = concat(node.body)
+        return _timed(node, f"''.join([{body} for {node.target} in {node.iterable}])")
+
+    raise TypeError(f"unknown markup node {node!r}")
+
+
+def join(nodes: List[Node]) -> str:
+    nodes = merge_text(nodes)
+    if not nodes:
+        return "''"
+
+    if len(nodes) > CHUNK_SIZE:
+        chunks = [
+            join(nodes[i : i + CHUNK_SIZE]) for i in range(0, len(nodes), CHUNK_SIZE)
+        ]
+        return chunked(chunks, lambda chunk: f"''.join([{', '.join(chunk)}])")
+
+    parts = [_join_node(node) for node in nodes]
+    if len(nodes) == 1:
+        return parts[0] if isinstance(nodes[0], Text) else f"({parts[0]})"
+
+    fstring = _fstring(nodes, parts)
+    if fstring is not None:
+        return fstring
+
+    return f"''.join([{', '.join(parts)}])"
+
+
+def _join_node(node: Node) -> str:
+    if isinstance(node, Text):
+        return repr(node.value)
+
+    if isinstance(node, Expr):
+        return _value(node)
+
+    if isinstance(node, Call):
+        args = list(node.args)
+        if node.slot is not None:
+            args.append(f"lambda: {join(node.slot)}")
+        elif node.slot_ref is not None:
+            args.append(node.slot_ref)
+        return _timed(node, f"{node.name}({', '.join(args)})")
+
+    if isinstance(node, If):
+        result = "''"
+        for branch in reversed(node.branches):
+            if branch.condition is None:
+                result = f"({join(branch.body)})"
+            else:
+                result = f"({join(branch.body)} if {branch.condition} else {result})"
+        return result
+
+    if isinstance(node, For):
+        # a list comprehension, not a generator expression: str.join builds a
+        # list from its argument anyway, so the generator only adds overhead
+        body = join(node.body)
+        return _timed(node, f"''.join([{body} for {node.target} in {node.iterable}])")
+
+    raise TypeError(f"unknown markup node {node!r}")
+
+
+def _fstring(nodes: List[Node], parts: List[str]) -> Optional[str]:
+    expressions = [
+        part for node, part in zip(nodes, parts) if not isinstance(node, Text)
+    ]
+    # before 3.12 an f-string expression can't contain a backslash, a comment
+    # or the quote that delimits the f-string
+    if any("\\" in part or "#" in part for part in expressions):
+        return None
+
+    for quote in ('"', "'"):
+        if not any(quote in part for part in expressions):
+            break
+    else:
+        return None
+
+    fstring = []
+    for node, part in zip(nodes, parts):
+        if isinstance(node, Text):
+            fstring.append(_escape(node.value, quote))
+        elif isinstance(node, Expr) and not node.safe:
+            # "!s" converts the same way the str() of the other paths does
+            fstring.append("{(" + node.code + ")!s}")
+        else:
+            fstring.append("{(" + part + ")}")
+
+    return f"f{quote}{''.join(fstring)}{quote}"
+
+
+def _escape(text: str, quote: str) -> str:
+    escaped = []
+    for char in text:
+        if char in "{}":
+            escaped.append(char * 2)
+        elif char == "\\" or char == quote:
+            escaped.append("\\" + char)
+        elif char == "\n":
+            escaped.append("\\n")
+        elif ord(char) < 32 or ord(char) == 127:
+            escaped.append(f"\\x{ord(char):02x}")
+        else:
+            escaped.append(char)
+    return "".join(escaped)
+
+
+def async_body(
+    nodes: List[Node], depth: int = 1, counter: Optional[Iterator[int]] = None
+) -> Tuple[List[str], str]:
+    """Statements that render every component call, if and for in `nodes`
+    concurrently, and the expression that assembles the results."""
+    counter = counter if counter is not None else itertools.count()
+    pad = "    " * depth
+    lines: List[str] = []
+    awaitables: List[Tuple[str, str]] = []
+    parts: List[Node] = []
+
+    for node in merge_text(nodes):
+        if isinstance(node, (Text, Expr)):
+            parts.append(node)
+            continue
+
+        idx = next(counter)
+        helper = f"_render_{idx}"
+        result = f"_result_{idx}"
+
+        if isinstance(node, Call) and node.slot is None:
+            awaitable = f"_resolve({node.name}({', '.join(node.args)}))"
+
+        elif isinstance(node, Call):
+            # the slot is rendered up front, so the child gets a plain string
+            # whether it's a sync or an async component
+            slot_lines, slot_output = async_body(node.slot, depth + 1, counter)
+            args = ", ".join([*node.args, f"lambda: _slot_{idx}"])
+            lines.append(f"{pad}async def {helper}():")
+            lines.extend(slot_lines)
+            lines.append(f"{pad}    _slot_{idx} = {slot_output}")
+            lines.append(f"{pad}    return await _resolve({node.name}({args}))")
+            awaitable = f"{helper}()"
+
+        elif isinstance(node, If):
+            lines.append(f"{pad}async def {helper}():")
+            for branch_idx, branch in enumerate(node.branches):
+                if branch.condition is None:
+                    lines.append(f"{pad}    else:")
+                else:
+                    keyword = "if" if branch_idx == 0 else "elif"
+                    lines.append(f"{pad}    {keyword} {branch.condition}:")
+                branch_lines, branch_output = async_body(
+                    branch.body, depth + 2, counter
+                )
+                lines.extend(branch_lines)
+                lines.append(f"{pad}        return {branch_output}")
+            lines.append(f"{pad}    return ''")
+            awaitable = f"{helper}()"
+
+        elif isinstance(node, For):
+            # every iteration renders concurrently, results keep their order
+            body_lines, body_output = async_body(node.body, depth + 2, counter)
+            lines.append(f"{pad}async def {helper}():")
+            lines.append(f"{pad}    async def _iteration({node.target}):")
+            lines.extend(body_lines)
+            lines.append(f"{pad}        return {body_output}")
+            lines.append(
+                f"{pad}    return ''.join(await _gather("
+                f"*[_iteration({node.target}) for {node.target} in {node.iterable}]))"
+            )
+            awaitable = f"{helper}()"
+
+        else:
+            raise TypeError(f"unknown markup node {node!r}")
+
+        awaitables.append((result, awaitable))
+        parts.append(Expr(result, safe=True))
+
+    if len(awaitables) == 1:
+        lines.append(f"{pad}{awaitables[0][0]} = await {awaitables[0][1]}")
+    elif awaitables:
+        results = ", ".join(result for result, _ in awaitables)
+        calls = ", ".join(awaitable for _, awaitable in awaitables)
+        lines.append(f"{pad}{results} = await _gather({calls})")
+
+    return lines, join(parts)
+
+
+def stream(
+    nodes: List[Node], depth: int = 1, counter: Optional[Iterator[int]] = None
+) -> List[str]:
+    counter = counter if counter is not None else itertools.count()
+    pad = "    " * depth
+    lines = []
+
+    for node in merge_text(nodes):
+        if isinstance(node, Text):
+            lines.append(f"{pad}yield {node.value!r}")
+
+        elif isinstance(node, Expr):
+            lines.append(f"{pad}yield {_value(node)}")
+
+        elif isinstance(node, Call):
+            args = list(node.args)
+            if node.slot is not None:
+                # slots become local generator functions so their chunks are
+                # forwarded with `yield from` instead of being joined first
+                slot_name = f"_slot_{next(counter)}"
+                lines.append(f"{pad}def {slot_name}():")
+                body = stream(node.slot, depth + 1, counter)
+                lines.extend(body or [f"{pad}    yield ''"])
+                args.append(slot_name)
+            elif node.slot_ref is not None:
+                args.append(node.slot_ref)
+            call = f"{node.name}({', '.join(args)})"
+            if node.profiled:
+                call = f"_profiled({_frame(node)}, {call})"
+            lines.append(f"{pad}yield from {call}")
+
+        elif isinstance(node, If):
+            for idx, branch in enumerate(node.branches):
+                if branch.condition is None:
+                    lines.append(f"{pad}else:")
+                else:
+                    keyword = "if" if idx == 0 else "elif"
+                    lines.append(f"{pad}{keyword} {branch.condition}:")
+                body = stream(branch.body, depth + 1, counter)
+                lines.extend(body or [f"{pad}    pass"])
+
+        elif isinstance(node, For) and node.profiled:
+            # the loop runs in a local generator so it can be timed as a unit
+            loop_name = f"_loop_{next(counter)}"
+            lines.append(f"{pad}def {loop_name}():")
+            lines.append(f"{pad}    for {node.target} in {node.iterable}:")
+            body = stream(node.body, depth + 2, counter)
+            lines.extend(body or [f"{pad}        yield ''"])
+            lines.append(f"{pad}yield from _profiled({_frame(node)}, {loop_name}())")
+
+        elif isinstance(node, For):
+            lines.append(f"{pad}for {node.target} in {node.iterable}:")
+            body = stream(node.body, depth + 1, counter)
+            lines.extend(body or [f"{pad}    pass"])
+
+        else:
+            raise TypeError(f"unknown markup node {node!r}")
+
+    return lines
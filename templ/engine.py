@@ -1,46 +1,299 @@
-import importlib
+import gc
+import json
 import os
-from typing import List
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from importlib.util import cache_from_source
+from types import CodeType
+from typing import Any, Callable, Dict, Iterator, List, Literal, Optional, Tuple
 
 import python_minifier
 import ruff_api
-from lark import Lark
 
-from templ.grammar import grammar
-from templ.transformer import Transformer
+from templ.assets import VENDOR_DIRECTORY, asset_url, vendor, write_assets
+from templ.manifest import (
+    MANIFEST_NAME,
+    Manifest,
+    ManifestEntry,
+    compiler_hash,
+    content_hash,
+    module_name,
+)
+from templ.pages import (
+    PageError,
+    Params,
+    batches,
+    data_hash,
+    is_dynamic,
+    page_path,
+    paths,
+    render_pages,
+)
+from templ.parser import find_imports, grammar_hash, parse
+from templ.profiles import PROFILES, ProfileName
+from templ.timing import Timings
+from templ.transformer import REAKTIV_WHEEL, Transformer
+
+
+class BuildError(Exception):
+    def __init__(self, errors: Dict[str, BaseException]):
+        self.errors = errors
+        super().__init__(
+            "\n".join(f"{template}: {error}" for template, error in errors.items())
+        )
+
+
+class TemplateError(Exception):
+    pass
+
+
+@dataclass
+class Rebuild:
+    modified: List[str]
+    seconds: float
+    timings: Optional[Timings] = None
+    error: Optional[BuildError] = None
+
+
+@contextmanager
+def _gc_paused():
+    # a parse tree is a huge number of small objects that all survive until
+    # the transform is done. Left on, the cyclic collector keeps rescanning
+    # them and compile time grows faster than the template does
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _compile_template(
+    engine: "Engine", content: str, filename: str
+) -> Tuple[str, List[str], Timings, Dict[str, str]]:
+    # workers time into their own Timings, which the build merges
+    timings = Timings()
+    assets: Dict[str, str] = {}
+    try:
+        output, imports = engine.compile(
+            content, timings=timings, filename=filename, assets=assets
+        )
+        if engine.reproducible:
+            again, _ = engine.compile(content, filename=filename)
+            if again != output:
+                raise TemplateError("two compiles of the same source differ")
+        return output, imports, timings, assets
+    except Exception as e:
+        # lark's exceptions can't be pickled back from a worker process
+        raise TemplateError(f"{type(e).__name__}: {e}") from None
+
+
+def _run(
+    executor: Optional[Executor], fn: Callable, jobs: Dict[str, tuple]
+) -> Tuple[Dict[str, Any], Dict[str, BaseException]]:
+    results: Dict[str, Any] = {}
+    errors: Dict[str, BaseException] = {}
+
+    if executor is None:
+        for key, args in jobs.items():
+            try:
+                results[key] = fn(*args)
+            except Exception as e:
+                errors[key] = e
+        return results, errors
+
+    futures = {key: executor.submit(fn, *args) for key, args in jobs.items()}
+    for key, future in futures.items():
+        try:
+            results[key] = future.result()
+        except Exception as e:
+            errors[key] = e
+
+    return results, errors
+
+
+def _has_content(path: str, content: str) -> bool:
+    try:
+        with open(path, "r") as existing:
+            return existing.read() == content
+    except OSError:
+        return False
 
 
 class Engine:
-    def __init__(self, csr_packages: List[str] = []):
+    def __init__(
+        self,
+        csr_packages: List[str] = [],
+        parser: str = "lalr",
+        backend: Literal["concat", "join", "stream"] = "concat",
+        autoescape: bool = False,
+        profile: ProfileName = "prod",
+        instrument: bool = False,
+        extract_styles: bool = False,
+        reproducible: bool = False,
+        precompress: Optional[int] = None,
+        lazy_imports: bool = False,
+        csr_assets: Optional[str] = None,
+        csr_assets_url: Optional[str] = None,
+        minify_html: bool = False,
+    ):
         self.csr_packages = csr_packages
+        self.parser = parser
+        self.backend = backend
+        self.autoescape = autoescape
+        self.profile = PROFILES[profile]
+        self.instrument = instrument
+        self.extract_styles = extract_styles
+        self.reproducible = reproducible
+        # zlib level of the .gz written next to each page, None for none
+        self.precompress = precompress
+        self.lazy_imports = lazy_imports
+        # where client code and vendored packages are written, and the URL
+        # they're served from. None inlines them into every render
+        self.csr_assets = csr_assets
+        if csr_assets is not None and csr_assets_url is None:
+            csr_assets_url = "/" + csr_assets.replace(os.sep, "/").strip("/")
+        self.csr_assets_url = csr_assets_url
+        self._vendored: Optional[List[str]] = None
+        # rewrite the markup itself at compile time, whatever the profile
+        self.minify_html = minify_html
 
-    def render(
-        self, template_path: str, save: bool = True, format: bool = True, minify=True
-    ) -> str:
-        with open(template_path, "r") as template_file:
-            content = template_file.read()
+    def compile(
+        self,
+        content: str,
+        format: Optional[bool] = None,
+        minify: Optional[bool] = None,
+        timings: Optional[Timings] = None,
+        filename: str = "<template>",
+        assets: Optional[Dict[str, str]] = None,
+    ) -> Tuple[str, List[str]]:
+        """`format` and `minify` default to the engine's profile. `filename`
+        is what instrumented code reports as the location of its calls.
+        `assets` receives the static files the output refers to, by file
+        name, to be written with `write_assets()`."""
+        format = self.profile.format if format is None else format
+        minify = self.profile.minify if minify is None else minify
+        timings = timings if timings is not None else Timings()
 
-        l = Lark(grammar, start="program", propagate_positions=True)
-        tree = l.parse(content)
+        with _gc_paused():
+            with timings.phase("parse"):
+                tree = parse(content, self.parser)
 
-        output: str = Transformer(csr_packages=self.csr_packages).transform(tree)
+            with timings.phase("transform"):
+                transformer = Transformer(
+                    csr_packages=self.csr_packages,
+                    backend=self.backend,
+                    autoescape=self.autoescape,
+                    fold_constants=self.profile.fold_constants,
+                    instrument=self.instrument,
+                    filename=filename,
+                    optimize_calls=self.profile.optimize_calls,
+                    extract_styles=self.extract_styles,
+                    minify_html=self.minify_html,
+                    source_hash=content_hash(content),
+                    lazy_imports=self.lazy_imports,
+                    csr_assets=self.csr_assets_url,
+                    client_packages=self._client_packages,
+                )
+                output: str = transformer.transform(tree)
+        if assets is not None:
+            assets.update(transformer.assets)
         if format:
-            output = ruff_api.format_string("", output.strip())
+            with timings.phase("format"):
+                output = ruff_api.format_string("", output.strip())
 
         if minify:
-            output = python_minifier.minify(output)
+            with timings.phase("minify"):
+                output = python_minifier.minify(output)
+
+        return output, find_imports(tree)
+
+    def compile_code(
+        self, content: str, filename: str = "<template>"
+    ) -> Tuple[CodeType, List[str]]:
+        output, imports = self.compile(content, filename=filename)
+        return compile(output, filename, "exec", dont_inherit=True), imports
+
+    def render(
+        self,
+        template_path: str,
+        save: bool = True,
+        format: Optional[bool] = None,
+        minify: Optional[bool] = None,
+    ) -> str:
+        with open(template_path, "r") as template_file:
+            content = template_file.read()
+
+        assets: Dict[str, str] = {}
+        output, _ = self.compile(
+            content, format, minify, filename=template_path, assets=assets
+        )
 
         if save:
-            file_name = template_path.replace(template_path.split(".")[-1], "py")
-            self.save(file_name, output)
+            self.save(self._output_path(template_path), output)
+            self.write_assets(assets)
 
             return
         return output
 
     def save(self, file_name: str, content: str):
+        # a reproducible build leaves unchanged files alone, mtime included,
+        # so sync and upload steps downstream see nothing to do
+        if self.reproducible and _has_content(file_name, content):
+            return
         with open(file_name, "w") as f:
             f.write(content)
 
+    def write_assets(self, assets: Dict[str, str]) -> List[str]:
+        if self.csr_assets is None:
+            return []
+        return write_assets(self.csr_assets, assets, self.precompress)
+
+    def _client_packages(self) -> Tuple[List[str], List[str]]:
+        """What client components and client scripts load. With an asset
+        directory these are downloaded into it the first time a template
+        needs them and loaded from there, rather than fetched from a package
+        index on every page view."""
+        if self.csr_assets is None:
+            return self.csr_packages, [REAKTIV_WHEEL]
+        if self._vendored is None:
+            files = vendor([*self.csr_packages, REAKTIV_WHEEL], self.csr_assets)
+            self._vendored = [
+                asset_url(self.csr_assets_url, VENDOR_DIRECTORY, file_name)
+                for file_name in files
+            ]
+        return self._vendored[:-1], self._vendored[-1:]
+
+    def _output_path(self, template_path: str, extension: str = "py") -> str:
+        return f"{os.path.splitext(template_path)[0]}.{extension}"
+
+    def _options_hash(
+        self, format: Optional[bool] = None, minify: Optional[bool] = None
+    ) -> str:
+        options = {
+            "fold_constants": self.profile.fold_constants,
+            "optimize_calls": self.profile.optimize_calls,
+            "minify_html": self.minify_html,
+            # the configured packages, not what they were vendored as, so
+            # hashing never has to download them
+            "csr_packages": self.csr_packages,
+            "csr_assets": self.csr_assets_url,
+            "parser": self.parser,
+            "backend": self.backend,
+            "autoescape": self.autoescape,
+            "instrument": self.instrument,
+            "extract_styles": self.extract_styles,
+            "precompress": self.precompress,
+            "lazy_imports": self.lazy_imports,
+            "format": self.profile.format if format is None else format,
+            "minify": self.profile.minify if minify is None else minify,
+        }
+        return content_hash(json.dumps(options, sort_keys=True))
+
     def _scan_directory(self, template_dir: str):
         for entry in os.listdir(template_dir):
             full_path = os.path.join(template_dir, entry)
@@ -50,17 +303,282 @@ class Engine:
                 if full_path.endswith(".pytempl"):
                     yield full_path
 
-    def ssr(self, template_dir: str):
+    def _build(
+        self,
+        template_dir: str,
+        incremental: bool,
+        pages: bool,
+        workers: int,
+        modified: Optional[List[str]] = None,
+        batch_size: int = 256,
+    ) -> Timings:
         templates = list(self._scan_directory(template_dir))
-        for template in templates:
-            self.render(template, True, True)
+        manifest = Manifest(os.path.join(template_dir, MANIFEST_NAME))
+        grammar_version = grammar_hash()
+        compiler_version = compiler_hash()
+        options = self._options_hash()
+        timings = Timings()
+
+        def read(template: str) -> str:
+            with open(template, "r") as template_file:
+                return template_file.read()
+
+        # when the caller already knows what was modified (watch), the rest
+        # of the tree isn't read or hashed at all
+        candidates = templates
+        if modified is not None:
+            candidates = [template for template in templates if template in modified]
+
+        sources = {}
+        changed = []
+        for template in candidates:
+            sources[template] = read(template)
+
+            source_hash = content_hash(sources[template])
+            if not incremental or not manifest.is_fresh(
+                template, source_hash, grammar_version, options, compiler_version
+            ):
+                changed.append(template)
+
+        stale = set(changed) | manifest.dependents(changed)
+        stale = [template for template in templates if template in stale]
+        for template in stale:
+            if template not in sources:
+                sources[template] = read(template)
+
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            compiled, errors = _run(
+                executor,
+                _compile_template,
+                {template: (self, sources[template], template) for template in stale},
+            )
+            # results are written in scan order, whatever order workers finish in
+            asset_paths: Dict[str, List[str]] = {}
+            for template, (output, _, compile_timings, assets) in compiled.items():
+                timings.merge(compile_timings)
+                with timings.phase("write"):
+                    self.save(self._output_path(template), output)
+                    asset_paths[template] = self.write_assets(assets)
+
+            written: Dict[str, Dict[str, str]] = {}
+            page_hashes: Dict[str, Dict[str, str]] = {}
+            if pages:
+                for template in compiled:
+                    # a long-lived process (watch) may have imported these
+                    # already, so pages must not see the old module or the
+                    # bytecode of a same-size file written in the same second
+                    sys.modules.pop(module_name(template), None)
+                    try:
+                        os.remove(cache_from_source(self._output_path(template)))
+                    except OSError:
+                        pass
+
+                with timings.phase("render"):
+                    written, page_hashes = self._render_pages(
+                        executor, templates, compiled, manifest, batch_size, errors
+                    )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        for template, (_, imports, _, _) in compiled.items():
+            if template in errors:
+                continue
+
+            # a deleted asset makes the template stale, so it's written again.
+            # Old versions are left for pages that still refer to them
+            outputs = [self._output_path(template), *asset_paths[template]]
+            if self.precompress is not None:
+                outputs.extend(f"{path}.gz" for path in asset_paths[template])
+            manifest.entries[template] = ManifestEntry(
+                source_hash=content_hash(sources[template]),
+                grammar_hash=grammar_version,
+                options_hash=options,
+                compiler_hash=compiler_version,
+                imports=imports,
+                outputs=outputs,
+            )
+            if not is_dynamic(template):
+                files = written.get(template, {})
+                manifest.entries[template].outputs.extend(files)
+                if self.precompress is not None:
+                    manifest.entries[template].outputs.extend(
+                        f"{path}.gz" for path in files
+                    )
+                manifest.entries[template].content_hashes = files
+
+        for template, hashes in page_hashes.items():
+            entry = manifest.entries.get(template)
+            if entry is not None:
+                entry.pages = hashes
+                content_hashes = {**entry.content_hashes, **written.get(template, {})}
+                entry.content_hashes = {
+                    path: file_hash
+                    for path, file_hash in content_hashes.items()
+                    if path in hashes
+                }
+
+        manifest.prune(templates)
+        manifest.save()
+
+        if errors:
+            raise BuildError(errors)
+
+        return timings
+
+    def _render_pages(
+        self,
+        executor: Optional[Executor],
+        templates: List[str],
+        compiled: Dict[str, Any],
+        manifest: Manifest,
+        batch_size: int,
+        errors: Dict[str, BaseException],
+    ) -> Tuple[Dict[str, Dict[str, str]], Dict[str, Dict[str, str]]]:
+        """Render the pages of recompiled templates, and of every dynamic
+        route whose data changed. Returns the content hash of the files
+        written for each template and the data hash of each dynamic route's
+        pages."""
+        jobs: Dict[Tuple[str, int], tuple] = {}
+        page_hashes: Dict[str, Dict[str, str]] = {}
+
+        def add_jobs(template: str, entries: List[Tuple[str, Params]]):
+            entry = manifest.entries.get(template)
+            content_hashes = entry.content_hashes if entry is not None else {}
+            for number, batch in enumerate(batches(entries, batch_size)):
+                jobs[(template, number)] = (
+                    module_name(template),
+                    batch,
+                    self.extract_styles,
+                    self.reproducible,
+                    self.precompress,
+                    {
+                        path: content_hashes[path]
+                        for path, _ in batch
+                        if path in content_hashes
+                    },
+                )
 
-    def ssg(self, template_dir: str):
-        templates = list(self._scan_directory(template_dir))
         for template in templates:
-            self.render(template, True, True)
-            template_module = importlib.import_module(
-                template.replace(".pytempl", "").replace("./", "").replace("/", ".")
+            if template in errors:
+                continue
+            if not is_dynamic(template):
+                if template in compiled:
+                    add_jobs(template, [(template.replace(".pytempl", ".html"), {})])
+                continue
+
+            # a route's data can change without its template changing, so
+            # paths() runs on every build and decides what's rendered
+            try:
+                entries = [
+                    (page_path(template, params), params)
+                    for params in paths(module_name(template))
+                ]
+            except PageError as e:
+                errors[template] = e
+                continue
+
+            entry = manifest.entries.get(template)
+            previous = entry.pages if entry is not None else {}
+            hashes = {path: data_hash(params) for path, params in entries}
+            add_jobs(
+                template,
+                [
+                    (path, params)
+                    for path, params in entries
+                    if template in compiled
+                    or previous.get(path) != hashes[path]
+                    or not os.path.exists(path)
+                ],
             )
-            if hasattr(template_module, "Page"):
-                self.save(template.replace(".pytempl", ".html"), template_module.Page())
+            # pages whose entry is gone from the data are deleted
+            for path in previous.keys() - hashes.keys():
+                for removed in (path, f"{path}.gz"):
+                    try:
+                        os.remove(removed)
+                    except OSError:
+                        pass
+            page_hashes[template] = hashes
+
+        results, batch_errors = _run(executor, render_pages, jobs)
+
+        written: Dict[str, Dict[str, str]] = {}
+        for (template, _), files in results.items():
+            written.setdefault(template, {}).update(files)
+        for (template, _), error in batch_errors.items():
+            errors.setdefault(template, error)
+        for template in errors:
+            # the failed pages get another go on the next build
+            page_hashes.pop(template, None)
+        return written, page_hashes
+
+    def ssr(
+        self, template_dir: str, incremental: bool = True, workers: int = 1
+    ) -> Timings:
+        return self._build(template_dir, incremental, pages=False, workers=workers)
+
+    def ssg(
+        self,
+        template_dir: str,
+        incremental: bool = True,
+        workers: int = 1,
+        batch_size: int = 256,
+    ) -> Timings:
+        """Compile `template_dir` and render its pages to HTML. A template
+        named like `[slug].pytempl` is a dynamic route: its module's `paths()`
+        yields the keyword arguments of each page's `Page`, rendered in
+        batches of `batch_size` per worker."""
+        return self._build(
+            template_dir,
+            incremental,
+            pages=True,
+            workers=workers,
+            batch_size=batch_size,
+        )
+
+    def _stat_tree(self, template_dir: str) -> Dict[str, Tuple[int, int]]:
+        stats = {}
+        for template in self._scan_directory(template_dir):
+            try:
+                stat = os.stat(template)
+            except OSError:
+                continue
+            stats[template] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+    def watch(
+        self, template_dir: str, pages: bool = False, interval: float = 0.05
+    ) -> Iterator[Rebuild]:
+        """Poll `template_dir` and rebuild what changed, yielding a `Rebuild`
+        for each change. The parser stays loaded between builds, so a rebuild
+        costs only the compile of the modified templates and their dependents.
+        """
+        snapshot = self._stat_tree(template_dir)
+        start = time.perf_counter()
+        try:
+            timings = self._build(template_dir, True, pages, workers=1)
+            yield Rebuild(list(snapshot), time.perf_counter() - start, timings)
+        except BuildError as e:
+            yield Rebuild(list(snapshot), time.perf_counter() - start, error=e)
+
+        while True:
+            time.sleep(interval)
+            current = self._stat_tree(template_dir)
+            if current == snapshot:
+                continue
+
+            modified = [
+                template
+                for template, stat in current.items()
+                if snapshot.get(template) != stat
+            ]
+            removed = [template for template in snapshot if template not in current]
+            snapshot = current
+
+            start = time.perf_counter()
+            try:
+                timings = self._build(template_dir, True, pages, 1, modified)
+                yield Rebuild(modified + removed, time.perf_counter() - start, timings)
+            except BuildError as e:
+                yield Rebuild(modified + removed, time.perf_counter() - start, error=e)
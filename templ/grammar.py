@@ -23,7 +23,8 @@ component_directive_name: CNAME
 component_directive_value: "(" component_args? ")"
 
 // Component definitions
-component_def: component_directive* "component" component_name "(" params? ")" "{" component_body "}"
+component_def: component_directive* async_modifier? "component" component_name "(" params? ")" "{" component_body "}"
+async_modifier: "async"
 component_name: CNAME
 params: CNAME ("," CNAME)*
 component_body: component_element*
@@ -48,7 +49,7 @@ style_content: /.+?(?=<\/style>)/s
 template_block: "<template>" template_content "</template>"
 template_content: template_element*
 
-doctype: "<!DOCTYPE" /[^>]+/ ">"
+doctype: "<!DOCTYPE" /[^>\s][^>]*/ ">"
 
 template_element: control_flow | component_call | doctype | style_block | html_element | interpolation | text_content
 
@@ -63,21 +64,30 @@ element_content: template_element*
 // Component calls
 component_call: "@" component_name "(" component_args? ")" component_body_call?
 component_args: component_arg ("," component_arg)*
-component_arg: dict_literal | list_literal | interpolation | STRING | NUMBER | CNAME
+component_arg: dict_literal | list_literal | value_interpolation | keyword_arg | STRING | NUMBER | CNAME
+keyword_arg: CNAME "=" (dict_literal | list_literal | value_interpolation | STRING | NUMBER | CNAME)
 component_body_call: "{" body_content "}"
 
-// Body content for component calls
+// Body content for component calls. Rules a body shares with markup have a
+// copy here, aliased to the same name, so that LALR keeps the states after
+// them apart: text that follows them is BODY_TEXT here and TEXT_CONTENT in
+// markup, and the contextual lexer must only be offered the one that fits
 body_content: body_element*
-body_element: control_flow | component_call | html_element | interpolation | body_text
+body_element: body_control_flow | body_component_call | body_html_element | body_interpolation | body_text
+body_component_call: "@" component_name "(" component_args? ")" body_component_body_call? -> component_call
+body_component_body_call: "{" body_content "}" -> component_body_call
+body_html_element: "<" tag_name attributes? ">" element_content "</" tag_name ">" -> html_element
+    | "<" tag_name attributes? "/>" -> html_element
+body_interpolation: INTERPOLATION_BLOCK -> interpolation
 
 // Python literals
 dict_literal: "{" dict_items* "}"
 dict_items: dict_item ("," dict_item)*
-dict_item: (STRING | CNAME) ":" (STRING | NUMBER | CNAME | interpolation)
+dict_item: (STRING | CNAME) ":" (STRING | NUMBER | CNAME | value_interpolation)
 
 list_literal: "[" list_items? "]"
 list_items: list_item ("," list_item)*
-list_item: STRING | NUMBER | CNAME | interpolation
+list_item: STRING | NUMBER | CNAME | value_interpolation
 
 control_flow: if_statement | for_loop
 
@@ -89,11 +99,22 @@ else_clause: "else" "{" body_element* "}"
 
 for_loop: "for" CNAME "in" (CNAME | interpolation) "{" body_element* "}"
 
+body_control_flow: body_if_statement -> control_flow
+    | body_for_loop -> control_flow
+body_if_statement: body_if_clause body_elif_clause* body_else_clause? -> if_statement
+body_if_clause: "if" PYTHON_CONDITION "{" body_element* "}" -> if_clause
+body_elif_clause: "elif" PYTHON_CONDITION "{" body_element* "}" -> elif_clause
+body_else_clause: "else" "{" body_element* "}" -> else_clause
+body_for_loop: "for" CNAME "in" (CNAME | interpolation) "{" body_element* "}" -> for_loop
+
 // Interpolation expressions - using terminal for complete block
 interpolation: INTERPOLATION_BLOCK
+// Separate rule so LALR doesn't merge literal and markup lookaheads
+value_interpolation: INTERPOLATION_BLOCK -> interpolation
 quoted_interpolation: QUOTED_INTERPOLATION
 
-// Text content
+// Text content. Markup text may contain "}", text in a call's or a control
+// flow's body can't, since "}" ends the body
 text_content: TEXT_CONTENT
 body_text: BODY_TEXT
 
@@ -101,6 +122,14 @@ body_text: BODY_TEXT
 PYTHON_CONDITION.8: /(?:[^{()[\]"']|\([^)]*\)|\[[^\]]*\]|"[^"]*"|'[^']*')+(?=\s*\{)/
 QUOTED_INTERPOLATION.10: /"\{\{[^}]*\}\}"/
 INTERPOLATION_BLOCK.9: /\{\{[^}]*\}\}/
-TEXT_CONTENT.5: /(?!if\b|elif\b|else\b)[^<@{]+/
-BODY_TEXT.5: /(?!if\b|elif\b|else\b)[^<@{}]+/
+"""
+
+# text gives way to a keyword only when it starts a whole control flow header,
+# `if <condition> {`, `else {` or `for <name> in <iterable> {`, so prose like
+# "if you want it" stays text. A condition can hold "<", but not a tag
+_CONDITION = r"(?:[^{}<]|<(?![A-Za-z\/!][^{}]*?>))*\{"
+_HEADER = rf"(?:(?:if|elif)\b{_CONDITION}|else\s*\{{|for\s+\w+\s+in\b{_CONDITION})"
+
+grammar += rf"""TEXT_CONTENT.5: /(?!{_HEADER})[^<@{{\s][^<@{{]*/
+BODY_TEXT.5: /(?!{_HEADER})[^<@{{}}\s][^<@{{}}]*/
 """
@@ -0,0 +1,147 @@
+import re
+from dataclasses import replace
+from typing import List, Optional, Tuple
+
+from templ.ast.markup import Branch, Call, For, If, Node, Text
+from templ.codegen import merge_text
+
+VOID_ELEMENTS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "source",
+    "track",
+    "wbr",
+}
+
+# elements whose content is shown or run exactly as written
+_RAW = re.compile(r"<(pre|textarea|script|style)\b|</(pre|textarea|script|style)>")
+
+_ATTRIBUTE_VALUE = re.compile(r'(="[^"]*")')
+_UNQUOTED = re.compile(r"""[^\s"'=<>`\\]+""")
+
+# <table> closes a <p> only in standards mode, so it isn't one of these
+_P_FOLLOWERS = (
+    "address|article|aside|blockquote|details|div|dl|fieldset|figcaption|figure"
+    "|footer|form|h[1-6]|header|hgroup|hr|main|menu|nav|ol|p|pre|section|ul"
+)
+
+# end tags the HTML spec lets a document leave out, with what must follow them.
+# Cells go first, so a row's end tag can go once its last cell's has
+_OPTIONAL_END_TAGS = [
+    re.compile(rf"</{tag}>(?=<(?:{followers})[\s/>])")
+    for tag, followers in [
+        ("td", r"td|th|/tr"),
+        ("th", r"td|th|/tr"),
+        ("tr", r"tr|/tbody|/thead|/tfoot|/table"),
+        ("thead", r"tbody|tfoot"),
+        ("tbody", r"tbody|tfoot|/table"),
+        ("tfoot", r"/table"),
+        ("li", r"li|/ul|/ol|/menu"),
+        ("dt", r"dt|dd"),
+        ("dd", r"dd|dt|/dl"),
+        ("option", r"option|optgroup|/select|/datalist|/optgroup"),
+        ("optgroup", r"optgroup|/select"),
+        ("p", _P_FOLLOWERS),
+    ]
+]
+
+_CSS_STRING = re.compile(r"""("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')""")
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+
+
+def unquote_attribute(value: str) -> str:
+    """`"value"` as an unquoted attribute value, when HTML allows one."""
+    if len(value) > 2 and value[0] == '"' and _UNQUOTED.fullmatch(value[1:-1]):
+        return value[1:-1]
+    return value
+
+
+def minify_css(css: str) -> str:
+    # strings are left exactly as written; only the code between them changes
+    parts = _CSS_STRING.split(_CSS_COMMENT.sub("", css))
+    for i in range(0, len(parts), 2):
+        code = re.sub(r"\s+", " ", parts[i])
+        code = _CSS_PUNCTUATION.sub(r"\1", code)
+        # a space before ":" can be a descendant selector, one after never is
+        code = re.sub(r":\s+", ":", code)
+        parts[i] = code.replace(";}", "}")
+    return "".join(parts).strip()
+
+
+def minify_js(js: str) -> str:
+    # without a parser, only indentation and blank lines are safe to drop:
+    # line breaks can end statements and `//` comments
+    lines = (line.strip() for line in js.strip().split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def _minify_text(value: str, raw: Optional[str]) -> Tuple[str, Optional[str]]:
+    parts: List[str] = []
+    position = 0
+    for match in _RAW.finditer(value):
+        opened, closed = match.groups()
+        if raw is None and opened:
+            parts.append(_minify_flow(value[position : match.start()]))
+            position = match.start()
+            raw = opened
+        elif raw is not None and closed == raw:
+            parts.append(value[position : match.end()])
+            position = match.end()
+            raw = None
+
+    rest = value[position:]
+    parts.append(rest if raw is not None else _minify_flow(rest))
+    return "".join(parts), raw
+
+
+def _minify_flow(value: str) -> str:
+    # quoted attribute values keep their whitespace
+    parts = _ATTRIBUTE_VALUE.split(value)
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r"\s+", " ", parts[i])
+    value = "".join(parts)
+    for pattern in _OPTIONAL_END_TAGS:
+        value = pattern.sub("", value)
+    return value
+
+
+def minify_markup(nodes: List[Node]) -> List[Node]:
+    """Collapse whitespace and drop optional end tags in the static text of
+    `nodes`. Text inside <pre>, <textarea>, <script> and <style> is kept as
+    written, and an end tag is only dropped when the tag that makes it
+    optional follows in the same text, never when that depends on a value."""
+    minified, _ = _minify(merge_text(nodes), None)
+    return minified
+
+
+def _minify(nodes: List[Node], raw: Optional[str]) -> Tuple[List[Node], Optional[str]]:
+    # `raw` is the element whose content is being kept as written, carried
+    # from one text node to the next. Bodies are assumed to be balanced
+    minified: List[Node] = []
+    for node in nodes:
+        if isinstance(node, Text):
+            value, raw = _minify_text(node.value, raw)
+            node = Text(value)
+        elif isinstance(node, Call) and node.slot is not None:
+            node = replace(node, slot=_minify(merge_text(node.slot), raw)[0])
+        elif isinstance(node, If):
+            node = If(
+                [
+                    Branch(b.condition, _minify(merge_text(b.body), raw)[0])
+                    for b in node.branches
+                ]
+            )
+        elif isinstance(node, For):
+            node = replace(node, body=_minify(merge_text(node.body), raw)[0])
+        minified.append(node)
+
+    return minified, raw
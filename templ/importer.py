@@ -0,0 +1,150 @@
+import hashlib
+import importlib.abc
+import importlib.util
+import marshal
+import os
+import struct
+import sys
+from types import CodeType, ModuleType
+from typing import Dict, Literal, Optional, Sequence
+
+from templ.engine import Engine
+from templ.manifest import compiler_hash, content_hash
+from templ.parser import grammar_hash
+
+EXTENSION = ".pytempl"
+
+# magic + compiler fingerprint + source mtime (ns) + source size + source hash
+_header = struct.Struct("<4s32sqQ32s")
+
+
+def cache_path(template_path: str) -> str:
+    directory, file_name = os.path.split(template_path)
+    return os.path.join(
+        directory,
+        "__pycache__",
+        f"{file_name}.{sys.implementation.cache_tag}.pyc",
+    )
+
+
+class PytemplLoader(importlib.abc.Loader):
+    def __init__(self, path: str, engine: Engine, check: Literal["mtime", "hash"]):
+        self.path = path
+        self.engine = engine
+        self.check = check
+
+    def _fingerprint(self) -> bytes:
+        options = self.engine._options_hash(False, False)
+        key = grammar_hash() + compiler_hash() + options
+        return hashlib.sha256(key.encode()).digest()
+
+    def _read_cache(
+        self, fingerprint: bytes, stat: os.stat_result
+    ) -> Optional[CodeType]:
+        try:
+            with open(cache_path(self.path), "rb") as cache_file:
+                data = cache_file.read()
+        except OSError:
+            return None
+
+        if len(data) < _header.size:
+            return None
+
+        magic, cached_fingerprint, mtime, size, source_hash = _header.unpack_from(data)
+        if magic != importlib.util.MAGIC_NUMBER or cached_fingerprint != fingerprint:
+            return None
+
+        if self.check == "hash":
+            if source_hash != bytes.fromhex(content_hash(self.get_source())):
+                return None
+        elif (mtime, size) != (stat.st_mtime_ns, stat.st_size):
+            return None
+
+        try:
+            return marshal.loads(data[_header.size :])
+        except (EOFError, ValueError, TypeError):
+            return None
+
+    def _write_cache(
+        self, fingerprint: bytes, stat: os.stat_result, source: str, code: CodeType
+    ):
+        path = cache_path(self.path)
+        header = _header.pack(
+            importlib.util.MAGIC_NUMBER,
+            fingerprint,
+            stat.st_mtime_ns,
+            stat.st_size,
+            bytes.fromhex(content_hash(source)),
+        )
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # write then rename so a concurrent import never sees half a file
+            temp_path = f"{path}.{os.getpid()}"
+            with open(temp_path, "wb") as cache_file:
+                cache_file.write(header + marshal.dumps(code))
+            os.replace(temp_path, path)
+        except OSError:
+            # read-only deploys still work, they just compile on every start
+            pass
+
+    def get_source(self, fullname: Optional[str] = None) -> str:
+        with open(self.path, "r") as template_file:
+            return template_file.read()
+
+    def get_code(self, fullname: Optional[str] = None) -> CodeType:
+        stat = os.stat(self.path)
+        fingerprint = self._fingerprint()
+
+        code = self._read_cache(fingerprint, stat)
+        if code is None:
+            source = self.get_source()
+            assets: Dict[str, str] = {}
+            output, _ = self.engine.compile(
+                source, format=False, minify=False, filename=self.path, assets=assets
+            )
+            self.engine.write_assets(assets)
+            code = compile(output, self.path, "exec", dont_inherit=True)
+            if not sys.dont_write_bytecode:
+                self._write_cache(fingerprint, stat, source, code)
+
+        return code
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module: ModuleType):
+        exec(self.get_code(module.__name__), module.__dict__)
+
+
+class PytemplFinder(importlib.abc.MetaPathFinder):
+    def __init__(
+        self, engine: Optional[Engine] = None, check: Literal["mtime", "hash"] = "mtime"
+    ):
+        self.engine = engine or Engine()
+        self.check = check
+
+    def find_spec(self, fullname: str, path: Optional[Sequence[str]], target=None):
+        name = fullname.rpartition(".")[2]
+        for entry in path if path is not None else sys.path:
+            template_path = os.path.join(entry or ".", name + EXTENSION)
+            if os.path.isfile(template_path):
+                loader = PytemplLoader(template_path, self.engine, self.check)
+                return importlib.util.spec_from_file_location(
+                    fullname, template_path, loader=loader
+                )
+
+        return None
+
+
+def install(
+    engine: Optional[Engine] = None, check: Literal["mtime", "hash"] = "mtime"
+) -> PytemplFinder:
+    uninstall()
+    finder = PytemplFinder(engine, check)
+    # ahead of the path finder, so a stale generated .py never shadows its template
+    sys.meta_path.insert(0, finder)
+    return finder
+
+
+def uninstall():
+    sys.meta_path[:] = [f for f in sys.meta_path if not isinstance(f, PytemplFinder)]
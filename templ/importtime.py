@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import List
+
+
+class ImportTimeError(Exception):
+    pass
+
+
+@dataclass
+class ImportTime:
+    module: str
+    # microseconds, as `python -X importtime` reports them
+    own: int
+    cumulative: int
+
+    @property
+    def is_template(self) -> bool:
+        # templates are imported by their path from the working directory
+        path = self.module.replace(".", os.sep)
+        return os.path.isfile(f"{path}.pytempl")
+
+
+def measure(module: str, python: str = sys.executable) -> List[ImportTime]:
+    """Import `module` in a fresh interpreter and return what each module it
+    pulled in cost. A fresh process is the only way to see a cold start:
+    everything already in sys.modules here would import for free."""
+    result = subprocess.run(
+        [
+            python,
+            "-X",
+            "importtime",
+            "-c",
+            f"__import__({module!r})",
+        ],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise ImportTimeError(lines[-1] if lines else f"importing {module} failed")
+
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        if not own.strip().isdigit():
+            # the header line
+            continue
+        times.append(ImportTime(name.strip(), int(own), int(cumulative)))
+    return times
+
+
+def report(
+    times: List[ImportTime], limit: int = 20, templates_only: bool = True
+) -> str:
+    """The modules that cost the most, by cumulative time: what importing
+    each one, and everything it imports in turn, added to startup."""
+    rows = [time for time in times if time.is_template or not templates_only]
+    rows.sort(key=lambda time: time.cumulative, reverse=True)
+
+    lines = [f"{'cumulative (ms)':>16}{'self (ms)':>12}  module"]
+    for time in rows[:limit]:
+        lines.append(
+            f"{time.cumulative / 1000:>16.3f}{time.own / 1000:>12.3f}  {time.module}"
+        )
+    total = max((time.cumulative for time in times), default=0)
+    lines.append(f"{total / 1000:>16.3f}{'':>12}  total")
+    return "\n".join(lines)
+
+
+__all__ = ["ImportTime", "ImportTimeError", "measure", "report"]
@@ -0,0 +1,45 @@
+import importlib
+from typing import Any, Dict
+
+
+class LazyComponent:
+    """Stands in for a component imported from another module until it's
+    first called. Resolving imports that module and puts the component in
+    place of the proxy, so later calls don't go through it at all.
+
+    Generated code only proxies names it uses as `@Component(...)` calls:
+    global lookups inside a module skip the module's `__getattr__`, and a
+    proxy that is only ever called can't be told apart from the component.
+    """
+
+    __slots__ = ("namespace", "name", "module", "attribute")
+
+    def __init__(
+        self, namespace: Dict[str, Any], name: str, module: str, attribute: str
+    ):
+        self.namespace = namespace
+        self.name = name
+        self.module = module
+        self.attribute = attribute
+
+    def resolve(self):
+        component = getattr(importlib.import_module(self.module), self.attribute)
+        self.namespace[self.name] = component
+        return component
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, attribute: str):
+        return getattr(self.resolve(), attribute)
+
+    def __repr__(self) -> str:
+        return f"<lazy {self.module}.{self.attribute}>"
+
+
+def lazy(namespace: Dict[str, Any], module: str, *names: str):
+    for name in names:
+        namespace[name] = LazyComponent(namespace, name, module, name)
+
+
+__all__ = ["LazyComponent", "lazy"]
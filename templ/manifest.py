@@ -0,0 +1,109 @@
+import functools
+import glob
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Set
+
+MANIFEST_NAME = ".pytempl-manifest.json"
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def compiler_hash() -> str:
+    """A hash of pytempl's own sources. Output compiled by another version of
+    the compiler is stale even when the grammar didn't change."""
+    package = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(package, "**", "*.py"), recursive=True)):
+        digest.update(os.path.relpath(path, package).encode())
+        with open(path, "rb") as source_file:
+            digest.update(source_file.read())
+    return digest.hexdigest()
+
+
+def module_name(template_path: str) -> str:
+    path = os.path.relpath(template_path).rsplit(".", 1)[0]
+    return path.replace(os.sep, ".")
+
+
+@dataclass
+class ManifestEntry:
+    source_hash: str
+    grammar_hash: str
+    options_hash: str
+    # manifests written before this was recorded never match, so they rebuild
+    compiler_hash: str = ""
+    imports: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    # the data hash of each page a dynamic route rendered, by output path
+    pages: Dict[str, str] = field(default_factory=dict)
+    # the content hash of each page written, by output path
+    content_hashes: Dict[str, str] = field(default_factory=dict)
+
+
+class Manifest:
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, ManifestEntry] = {}
+
+        if os.path.exists(path):
+            with open(path, "r") as manifest_file:
+                data = json.load(manifest_file)
+            self.entries = {
+                template: ManifestEntry(**entry) for template, entry in data.items()
+            }
+
+    def is_fresh(
+        self,
+        template: str,
+        source_hash: str,
+        grammar_hash: str,
+        options_hash: str,
+        compiler_hash: str,
+    ) -> bool:
+        entry = self.entries.get(template)
+        if entry is None:
+            return False
+
+        return (
+            entry.source_hash == source_hash
+            and entry.grammar_hash == grammar_hash
+            and entry.options_hash == options_hash
+            and entry.compiler_hash == compiler_hash
+            and all(os.path.exists(output) for output in entry.outputs)
+        )
+
+    def dependents(self, templates: Iterable[str]) -> Set[str]:
+        importers: Dict[str, Set[str]] = {}
+        for template, entry in self.entries.items():
+            for imported in entry.imports:
+                importers.setdefault(imported, set()).add(template)
+
+        result: Set[str] = set()
+        pending = list(templates)
+        while pending:
+            template = pending.pop()
+            for importer in importers.get(module_name(template), ()):
+                if importer not in result:
+                    result.add(importer)
+                    pending.append(importer)
+
+        return result
+
+    def prune(self, templates: Iterable[str]):
+        keep = set(templates)
+        self.entries = {k: v for k, v in self.entries.items() if k in keep}
+
+    def save(self):
+        with open(self.path, "w") as manifest_file:
+            json.dump(
+                {template: asdict(entry) for template, entry in self.entries.items()},
+                manifest_file,
+                indent=2,
+                sort_keys=True,
+            )
@@ -0,0 +1,356 @@
+import ast
+import itertools
+import textwrap
+from dataclasses import replace
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from templ.ast.components import Component
+from templ.ast.markup import Branch, Call, Expr, For, If, Node, calls
+
+# components whose markup is at most this many nodes, with no Python block
+# and no calls or loops of their own, are inlined where they're called
+LEAF_SIZE = 16
+
+
+def expression_names(code: str) -> Optional[Set[str]]:
+    """The names an expression reads from its scope, or None if it doesn't
+    parse. Names bound inside it (comprehensions, lambdas) don't count."""
+    try:
+        tree = ast.parse(code.strip(), mode="eval")
+    except SyntaxError:
+        return None
+    return _free(tree)
+
+
+def _free(tree: ast.AST) -> Set[str]:
+    loads: Set[str] = set()
+    bound: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            (loads if isinstance(node.ctx, ast.Load) else bound).add(node.id)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+    return loads - bound
+
+
+def _arguments(args: List[str]) -> Optional[ast.Call]:
+    # positional and keyword arguments parse the same way they'd be emitted
+    try:
+        tree = ast.parse(f"_({', '.join(args)})", mode="eval")
+    except SyntaxError:
+        return None
+    return tree.body if isinstance(tree.body, ast.Call) else None
+
+
+def free_names(nodes: List[Node], callees: bool = True) -> Optional[Set[str]]:
+    """Every name `nodes` read from the enclosing function or module, or None
+    when one of the expressions can't be analysed. With `callees=False`, the
+    names of called components only count if they're also read elsewhere."""
+    names: Set[str] = set()
+    for node in nodes:
+        found: Optional[Set[str]] = set()
+        if isinstance(node, Expr):
+            found = expression_names(node.code)
+        elif isinstance(node, Call):
+            arguments = _arguments(node.args)
+            slot = free_names(node.slot, callees) if node.slot is not None else set()
+            if arguments is None or slot is None:
+                return None
+            found = (_free(arguments) - {"_"}) | slot
+            if callees:
+                found.add(node.name)
+        elif isinstance(node, If):
+            for branch in node.branches:
+                condition = (
+                    expression_names(branch.condition)
+                    if branch.condition is not None
+                    else set()
+                )
+                body = free_names(branch.body, callees)
+                if condition is None or body is None:
+                    return None
+                names |= condition | body
+        elif isinstance(node, For):
+            iterable = expression_names(node.iterable)
+            body = free_names(node.body, callees)
+            if iterable is None or body is None:
+                return None
+            found = iterable | (body - {node.target})
+
+        if found is None:
+            return None
+        names |= found
+    return names
+
+
+def local_names(component: Component) -> Optional[Set[str]]:
+    """Names that are local to the component's function: its parameters and
+    whatever its Python block binds."""
+    try:
+        tree = ast.parse(textwrap.dedent(component.python_code))
+    except SyntaxError:
+        return None
+
+    names = set(component.params)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update(
+                (alias.asname or alias.name).split(".")[0] for alias in node.names
+            )
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+    return names
+
+
+def lazy_names(components: List[Component], imported: Iterable[str]) -> Set[str]:
+    """The imported names that are only ever called as components, which is
+    all a lazy proxy can stand in for."""
+    called: Set[str] = set()
+    read: Set[str] = set()
+    for component in components:
+        if _is_client(component):
+            continue
+        names = free_names(component.markup, callees=False)
+        try:
+            tree = ast.parse(textwrap.dedent(component.python_code))
+        except SyntaxError:
+            return set()
+        if names is None:
+            return set()
+        called.update(calls(component.markup))
+        # anything the Python block touches is left alone, bound or read
+        read |= names | {
+            node.id for node in ast.walk(tree) if isinstance(node, ast.Name)
+        }
+    return (called - read) & set(imported)
+
+
+def _is_client(component: Component) -> bool:
+    # client components are shipped on their own, without the rest of the module
+    return any(directive.name == "mode" for directive in component.directives)
+
+
+def hoist_slots(components: List[Component]) -> List[Component]:
+    """Move slot bodies that use none of their caller's locals out to module
+    level functions. The call passes that function instead of a `lambda`, so
+    no closure is created per call, or per iteration inside a loop. Returns
+    the new functions, to be generated like any other component."""
+    hoisted: List[Component] = []
+    counter = itertools.count()
+
+    def visit(nodes: List[Node], scope: Set[str]) -> List[Node]:
+        visited: List[Node] = []
+        for node in nodes:
+            if isinstance(node, Call) and node.slot is not None:
+                names = free_names(node.slot)
+                if names is not None and not names & scope:
+                    name = f"_hoisted_slot_{next(counter)}"
+                    hoisted.append(Component(name, [], "", visit(node.slot, set())))
+                    node = replace(node, slot=None, slot_ref=name)
+                else:
+                    node = replace(node, slot=visit(node.slot, scope))
+            elif isinstance(node, If):
+                node = If(
+                    [Branch(b.condition, visit(b.body, scope)) for b in node.branches]
+                )
+            elif isinstance(node, For):
+                node = replace(node, body=visit(node.body, scope | {node.target}))
+            visited.append(node)
+        return visited
+
+    for component in components:
+        if component.is_async or _is_client(component):
+            continue
+        scope = local_names(component)
+        if scope is not None:
+            component.markup = visit(component.markup, scope)
+
+    return hoisted
+
+
+def _size(nodes: List[Node]) -> int:
+    size = 0
+    for node in nodes:
+        size += 1
+        if isinstance(node, If):
+            size += sum(_size(branch.body) for branch in node.branches)
+    return size
+
+
+def _is_flat(nodes: List[Node]) -> bool:
+    # text, expressions and branches over them: nothing that calls out or
+    # binds a loop variable in the caller once inlined
+    for node in nodes:
+        if isinstance(node, (Call, For)):
+            return False
+        if isinstance(node, If) and not all(_is_flat(b.body) for b in node.branches):
+            return False
+    return True
+
+
+def _is_leaf(component: Component) -> bool:
+    return (
+        not component.python_code.strip()
+        and not component.directives
+        and not component.is_async
+        and _is_flat(component.markup)
+        and _size(component.markup) <= LEAF_SIZE
+    )
+
+
+def _bind(call: Call, target: Component) -> Optional[Dict[str, ast.expr]]:
+    arguments = _arguments(call.args)
+    if arguments is None or len(arguments.args) > len(target.params):
+        return None
+
+    bindings: Dict[str, ast.expr] = dict(zip(target.params, arguments.args))
+    for keyword in arguments.keywords:
+        if keyword.arg is None or keyword.arg in bindings:
+            return None
+        bindings[keyword.arg] = keyword.value
+    if set(bindings) != set(target.params):
+        return None
+
+    for value in bindings.values():
+        # each use of a parameter re-evaluates its argument, which is only
+        # safe when that has no side effects and costs next to nothing
+        if isinstance(value, ast.Starred):
+            return None
+        if not isinstance(value, ast.Name):
+            try:
+                ast.literal_eval(value)
+            except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+                return None
+    return bindings
+
+
+class _Substitute(ast.NodeTransformer):
+    def __init__(self, bindings: Dict[str, ast.expr]):
+        self.bindings = bindings
+
+    def visit_Name(self, node: ast.Name):
+        if isinstance(node.ctx, ast.Load) and node.id in self.bindings:
+            return ast.copy_location(
+                ast.parse(ast.unparse(self.bindings[node.id]), mode="eval").body, node
+            )
+        return node
+
+
+def _substitute(code: str, bindings: Dict[str, ast.expr]) -> Optional[str]:
+    tree = ast.parse(code.strip(), mode="eval")
+    bound: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            bound.add(node.id)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+    # a parameter rebound inside the expression can't be replaced, and an
+    # argument mustn't be captured by a comprehension, lambda or walrus there
+    arguments = set().union(*(_free(value) for value in bindings.values()))
+    if bound & (set(bindings) | arguments):
+        return None
+    return ast.unparse(_Substitute(bindings).visit(tree))
+
+
+def _expand(nodes: List[Node], bindings: Dict[str, ast.expr]) -> Optional[List[Node]]:
+    expanded: List[Node] = []
+    for node in nodes:
+        if isinstance(node, Expr):
+            code = _substitute(node.code, bindings)
+            if code is None:
+                return None
+            node = replace(node, code=code)
+        elif isinstance(node, If):
+            branches = []
+            for branch in node.branches:
+                condition = branch.condition
+                if condition is not None:
+                    condition = _substitute(condition, bindings)
+                    if condition is None:
+                        return None
+                body = _expand(branch.body, bindings)
+                if body is None:
+                    return None
+                branches.append(Branch(condition, body))
+            node = If(branches)
+        expanded.append(node)
+    return expanded
+
+
+def _inline_call(
+    call: Call, leaves: Dict[str, Component], scope: Set[str]
+) -> Optional[List[Node]]:
+    target = leaves.get(call.name)
+    if target is None or call.slot is not None or call.name in scope:
+        return None
+
+    bindings = _bind(call, target)
+    names = free_names(target.markup)
+    # the leaf's own globals mustn't be shadowed by a local where it lands
+    if bindings is None or names is None or (names - set(target.params)) & scope:
+        return None
+    return _expand(target.markup, bindings)
+
+
+def _inline_leaves(
+    nodes: List[Node], leaves: Dict[str, Component], scope: Set[str]
+) -> List[Node]:
+    inlined: List[Node] = []
+    for node in nodes:
+        if isinstance(node, Call):
+            markup = _inline_call(node, leaves, scope)
+            if markup is not None:
+                inlined.extend(markup)
+                continue
+            if node.slot is not None:
+                node = replace(node, slot=_inline_leaves(node.slot, leaves, scope))
+        elif isinstance(node, If):
+            node = If(
+                [
+                    Branch(b.condition, _inline_leaves(b.body, leaves, scope))
+                    for b in node.branches
+                ]
+            )
+        elif isinstance(node, For):
+            body = _inline_leaves(node.body, leaves, scope | {node.target})
+            node = replace(node, body=body)
+        inlined.append(node)
+    return inlined
+
+
+def _callees_first(components: List[Component]) -> Iterator[Component]:
+    # a leaf's own calls are inlined before it's considered as a leaf itself
+    by_name = {component.name: component for component in components}
+    seen: Set[str] = set()
+
+    def visit(component: Component) -> Iterator[Component]:
+        seen.add(component.name)
+        for name in calls(component.markup):
+            if name in by_name and name not in seen:
+                yield from visit(by_name[name])
+        yield component
+
+    for component in components:
+        if by_name[component.name] is not component:
+            yield component
+        elif component.name not in seen:
+            yield from visit(component)
+
+
+def inline_leaves(components: List[Component]):
+    """Replace calls to small leaf components with the leaf's markup, its
+    parameters substituted by the call's arguments. Only arguments that are
+    names or literals qualify, so evaluating them once per use is harmless."""
+    by_name = {component.name: component for component in components}
+    leaves: Dict[str, Component] = {}
+    for component in _callees_first(components):
+        scope = local_names(component) if not component.is_async else None
+        if scope is None:
+            continue
+        component.markup = _inline_leaves(component.markup, leaves, scope)
+        if by_name[component.name] is component and _is_leaf(component):
+            leaves[component.name] = component
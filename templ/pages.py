@@ -0,0 +1,208 @@
+import filecmp
+import hashlib
+import importlib
+import json
+import os
+import re
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from templ.manifest import content_hash
+from templ.styles import collect
+
+# `pages/[slug].pytempl` renders one page per entry of its module's `paths()`
+_PARAMETER = re.compile(r"\[(\w+)\]")
+
+Params = Dict[str, Any]
+
+
+class PageError(Exception):
+    pass
+
+
+def is_dynamic(template: str) -> bool:
+    return _PARAMETER.search(os.path.basename(template)) is not None
+
+
+def page_path(template: str, params: Params) -> str:
+    """Where the page for `params` is written: the template's path with each
+    `[name]` replaced by that parameter."""
+
+    def substitute(match: re.Match) -> str:
+        name = match.group(1)
+        if name not in params:
+            raise PageError(f"paths() entry {params!r} has no {name!r}")
+        value = str(params[name])
+        # a value comes from data, it mustn't write outside the pages' folder
+        if not value or "/" in value or os.sep in value or value in (".", ".."):
+            raise PageError(f"{name}={value!r} isn't a valid file name")
+        return value
+
+    directory, file_name = os.path.split(template)
+    file_name = _PARAMETER.sub(substitute, file_name)
+    return os.path.join(directory, file_name.replace(".pytempl", ".html"))
+
+
+def data_hash(params: Params) -> str:
+    # everything a page renders from should come in through its params, so
+    # that this hash changes exactly when the page does
+    return content_hash(json.dumps(params, sort_keys=True, default=str))
+
+
+def paths(name: str) -> List[Params]:
+    try:
+        importlib.invalidate_caches()
+        template_module = importlib.import_module(name)
+        entries = getattr(template_module, "paths", None)
+        if entries is None:
+            raise PageError("a dynamic route must have a paths() generator")
+        return [dict(entry) for entry in entries()]
+    except Exception as e:
+        raise PageError(f"{type(e).__name__}: {e}") from None
+
+
+def _write(path: str, chunks: Iterable[bytes], reproducible: bool = False):
+    """Write `chunks` to `path` as they come, without joining them first.
+    The file is replaced in one step, so readers never see half a page."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as output_file:
+            for chunk in chunks:
+                output_file.write(chunk)
+        # unchanged files keep their mtime, see Engine(reproducible=True)
+        if reproducible and os.path.exists(path):
+            if filecmp.cmp(temporary, path, shallow=False):
+                os.remove(temporary)
+                return
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def write_file(
+    path: str,
+    chunks: Iterable[str],
+    reproducible: bool = False,
+    precompress: Optional[int] = None,
+    previous: Optional[str] = None,
+) -> str:
+    """Write a page or bundle and return the hash of its content. With
+    `precompress`, a gzip sibling is written from the same bytes at that zlib
+    level, unless the content hash is still `previous` and the sibling is
+    already there."""
+    digest = hashlib.sha256()
+    content: List[bytes] = []
+
+    def encoded() -> Iterator[bytes]:
+        for chunk in chunks:
+            data = chunk.encode()
+            digest.update(data)
+            if precompress is not None:
+                content.append(data)
+            yield data
+
+    _write(path, encoded(), reproducible)
+    file_hash = digest.hexdigest()
+
+    compressed_path = f"{path}.gz"
+    if precompress is not None and (
+        file_hash != previous or not os.path.exists(compressed_path)
+    ):
+        # wbits=31 makes zlib write a gzip stream. Its header carries no
+        # timestamp, so the same page always compresses to the same bytes
+        compressed = zlib.compress(b"".join(content), precompress, wbits=31)
+        _write(compressed_path, [compressed], reproducible)
+    return file_hash
+
+
+def write_bundle(
+    page: str, sheets: Dict[str, str], precompress: Optional[int] = None
+) -> Tuple[str, str]:
+    """Write the page's stylesheets next to it as one file named after its
+    content, and return its path and hash. Pages that use the same components
+    share the bundle, and an unchanged bundle is neither rewritten nor
+    re-fetched by browsers."""
+    bundle = "\n".join(sheets.values())
+    bundle_hash = content_hash(bundle)
+    bundle_path = os.path.join(os.path.dirname(page), f"styles.{bundle_hash[:12]}.css")
+    if not os.path.exists(bundle_path) or (
+        precompress is not None and not os.path.exists(f"{bundle_path}.gz")
+    ):
+        write_file(bundle_path, [bundle], precompress=precompress)
+    return bundle_path, bundle_hash
+
+
+def link_stylesheet(page: str, href: str) -> str:
+    link = f'<link rel="stylesheet" href="{href}">'
+    head_end = page.find("</head>")
+    if head_end == -1:
+        return link + page
+    return page[:head_end] + link + page[head_end:]
+
+
+def _chunks(page) -> Iterator[str]:
+    if isinstance(page, str):
+        yield page
+    else:
+        yield from page
+
+
+def render_pages(
+    name: str,
+    pages: List[Tuple[str, Params]],
+    extract_styles: bool = False,
+    reproducible: bool = False,
+    precompress: Optional[int] = None,
+    previous: Optional[Dict[str, str]] = None,
+) -> Dict[str, str]:
+    """Render a batch of one template's pages and write them, returning the
+    content hash of each file written. Runs in build workers, so a page goes
+    from the generated code to disk without being sent back to the parent
+    process. `previous` holds the hashes from the last build."""
+    try:
+        # generated modules may have appeared since this worker last imported
+        importlib.invalidate_caches()
+        template_module = importlib.import_module(name)
+    except Exception as e:
+        raise PageError(f"{type(e).__name__}: {e}") from None
+    if not hasattr(template_module, "Page"):
+        return {}
+
+    previous = previous or {}
+    written: Dict[str, str] = {}
+    for path, params in pages:
+        options = dict(
+            reproducible=reproducible,
+            precompress=precompress,
+            previous=previous.get(path),
+        )
+        try:
+            # extracted styles are gathered for the page's bundle, not inlined
+            with collect(inline=False) as styles:
+                page = template_module.Page(**params)
+                if not extract_styles:
+                    written[path] = write_file(path, _chunks(page), **options)
+                else:
+                    # the <link> goes in the <head>, before the sheets the
+                    # body uses are known, so these pages are buffered
+                    page = "".join(_chunks(page))
+        except Exception as e:
+            raise PageError(f"{path}: {type(e).__name__}: {e}") from None
+
+        if extract_styles:
+            if styles.sheets:
+                bundle_path, bundle_hash = write_bundle(
+                    path, styles.sheets, precompress
+                )
+                page = link_stylesheet(page, os.path.basename(bundle_path))
+                written[bundle_path] = bundle_hash
+            written[path] = write_file(path, [page], **options)
+    return written
+
+
+def batches(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
@@ -0,0 +1,50 @@
+import hashlib
+from typing import Dict, List, Tuple
+
+from lark import Lark, Tree
+from lark.exceptions import UnexpectedInput
+
+from templ.grammar import grammar
+
+_parsers: Dict[Tuple[str, str], Lark] = {}
+
+
+def grammar_hash(source: str = grammar) -> str:
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def get_parser(algorithm: str = "lalr", source: str = grammar) -> Lark:
+    key = (grammar_hash(source), algorithm)
+    parser = _parsers.get(key)
+    if parser is None:
+        options = {"start": "program", "propagate_positions": True, "parser": algorithm}
+        if algorithm == "lalr":
+            # lark serializes the LALR tables to the temp dir, keyed by the grammar
+            # and options, and loads them from there on the next interpreter start
+            options["cache"] = True
+
+        parser = Lark(source, **options)
+        _parsers[key] = parser
+
+    return parser
+
+
+def parse(content: str, algorithm: str = "lalr") -> Tree:
+    try:
+        return get_parser(algorithm).parse(content)
+    except UnexpectedInput:
+        if algorithm == "earley":
+            raise
+
+        # the dynamic Earley lexer accepts a few ambiguous inputs LALR can't
+        return get_parser("earley").parse(content)
+
+
+def find_imports(tree: Tree) -> List[str]:
+    imports = []
+    for child in tree.children:
+        if isinstance(child, Tree) and child.data == "import_stmt":
+            for module in child.find_data("module_name"):
+                imports.append(".".join(module.children))
+
+    return imports
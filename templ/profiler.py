@@ -0,0 +1,137 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# one profile per request: a ContextVar keeps concurrent requests in threads
+# or asyncio tasks from writing into each other's trees
+_active: ContextVar[Optional["Profile"]] = ContextVar("pytempl_profile", default=None)
+
+
+@dataclass
+class Frame:
+    name: str
+    location: str = ""
+    calls: int = 0
+    inclusive: float = 0.0
+    children: Dict[Tuple[str, str], "Frame"] = field(default_factory=dict)
+
+    @property
+    def exclusive(self) -> float:
+        return self.inclusive - sum(child.inclusive for child in self.children.values())
+
+    @property
+    def label(self) -> str:
+        return f"{self.name} ({self.location})" if self.location else self.name
+
+    def child(self, name: str, location: str) -> "Frame":
+        frame = self.children.get((name, location))
+        if frame is None:
+            frame = self.children[(name, location)] = Frame(name, location)
+        return frame
+
+
+class Profile:
+    def __init__(self, name: str = "request"):
+        self.root = Frame(name)
+        self.stack: List[Tuple[Frame, float]] = []
+
+    def push(self, name: str, location: str, calls: int = 1):
+        parent = self.stack[-1][0] if self.stack else self.root
+        frame = parent.child(name, location)
+        frame.calls += calls
+        self.stack.append((frame, time.perf_counter()))
+
+    def pop(self):
+        frame, start = self.stack.pop()
+        frame.inclusive += time.perf_counter() - start
+
+    def collapsed(self) -> List[str]:
+        """The tree as collapsed stacks, the input format of flamegraph.pl and
+        speedscope: one line per stack with its exclusive time in microseconds."""
+        lines = []
+        pending = [(self.root, [self.root.label])]
+        while pending:
+            frame, stack = pending.pop()
+            microseconds = round(frame.exclusive * 1e6)
+            if microseconds > 0:
+                lines.append(f"{';'.join(stack)} {microseconds}")
+            for child in frame.children.values():
+                pending.append((child, [*stack, child.label]))
+        return sorted(lines)
+
+    def write_collapsed(self, path: str):
+        with open(path, "w") as collapsed_file:
+            collapsed_file.write("\n".join(self.collapsed()) + "\n")
+
+    def report(self) -> str:
+        lines = [f"{'inclusive (ms)':>15}{'exclusive (ms)':>15}{'calls':>8}  frame"]
+        pending = [(self.root, 0)]
+        while pending:
+            frame, depth = pending.pop()
+            lines.append(
+                f"{frame.inclusive * 1000:>15.3f}{frame.exclusive * 1000:>15.3f}"
+                f"{frame.calls:>8}  {'  ' * depth}{frame.label}"
+            )
+            children = sorted(frame.children.values(), key=lambda f: f.inclusive)
+            pending.extend((child, depth + 1) for child in children)
+        return "\n".join(lines)
+
+
+@contextmanager
+def profile(name: str = "request") -> Iterator[Profile]:
+    """Collect the component tree of everything rendered inside the block.
+    Only code compiled with `Engine(instrument=True)` reports into it."""
+    current = Profile(name)
+    token = _active.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.root.calls += 1
+        current.root.inclusive += time.perf_counter() - start
+        _active.reset(token)
+
+
+# instrumented code calls `leave(enter(name, location), <call>)`: arguments
+# are evaluated in order, so the call runs between the two timestamps and
+# the wrapped call stays a single expression
+
+
+def enter(name: str, location: str) -> Optional[Profile]:
+    current = _active.get()
+    if current is not None:
+        current.push(name, location)
+    return current
+
+
+def leave(current: Optional[Profile], value):
+    if current is not None:
+        current.pop()
+    return value
+
+
+def profiled(name: str, location: str, chunks: Iterable[str]) -> Iterator[str]:
+    """Time a streamed call. The frame is only open while the generator runs,
+    so time the consumer spends between chunks isn't charged to it."""
+    current = _active.get()
+    if current is None:
+        yield from chunks
+        return
+
+    iterator = iter(chunks)
+    calls = 1
+    while True:
+        current.push(name, location, calls)
+        calls = 0
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            current.pop()
+        yield chunk
+
+
+__all__ = ["Frame", "Profile", "enter", "leave", "profile", "profiled"]
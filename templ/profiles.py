@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+from typing import Dict, Literal
+
+
+@dataclass(frozen=True)
+class Profile:
+    name: str
+    format: bool = False
+    minify: bool = False
+    fold_constants: bool = False
+    optimize_calls: bool = False
+
+
+PROFILES: Dict[str, Profile] = {
+    # straight from the transformer, for the edit-compile loop
+    "dev": Profile("dev"),
+    # the smallest and fastest output: literal expressions and branches are
+    # folded away, small leaf components are inlined and slots that don't
+    # need a closure are hoisted, before python_minifier runs
+    "prod": Profile("prod", minify=True, fold_constants=True, optimize_calls=True),
+    # formatted with ruff, for reading generated code
+    "debug": Profile("debug", format=True),
+}
+
+ProfileName = Literal["dev", "prod", "debug"]
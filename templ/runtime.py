@@ -0,0 +1,43 @@
+import inspect
+from asyncio import gather
+
+
+class Markup(str):
+    """A string that is already safe to embed in HTML and is never escaped."""
+
+    __slots__ = ()
+
+    def __html__(self):
+        return self
+
+
+def escape(value) -> str:
+    if value.__class__ is not str:
+        if hasattr(value, "__html__"):
+            return value.__html__()
+        value = str(value)
+
+    # five memchr scans are much cheaper than a translate table or a regex,
+    # and most interpolated values contain none of these characters
+    if "&" in value or "<" in value or ">" in value or '"' in value or "'" in value:
+        return (
+            value.replace("&", "&amp;")
+            .replace("<", "&lt;")
+            .replace(">", "&gt;")
+            .replace('"', "&#34;")
+            .replace("'", "&#39;")
+        )
+    return value
+
+
+async def resolve(value) -> str:
+    """Render whatever a child component returned, for async parents that don't
+    know whether the child is sync, async or a streaming generator."""
+    if inspect.isawaitable(value):
+        value = await value
+    if not isinstance(value, str):
+        value = "".join(value)
+    return value
+
+
+__all__ = ["Markup", "escape", "gather", "resolve"]
@@ -0,0 +1,27 @@
+import asyncio
+from typing import AsyncIterator, Iterable, Sequence
+
+
+async def iter_chunks(
+    chunks: Iterable[str],
+    buffer_size: int = 4096,
+    flush_after: Sequence[str] = ("</head>",),
+) -> AsyncIterator[str]:
+    buffer = []
+    size = 0
+
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+
+        # send the <head> on its own so the browser can start fetching assets
+        # while the body is still rendering
+        if size >= buffer_size or any(marker in chunk for marker in flush_after):
+            yield "".join(buffer)
+            buffer.clear()
+            size = 0
+            # give other requests on the event loop a turn between chunks
+            await asyncio.sleep(0)
+
+    if buffer:
+        yield "".join(buffer)
@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Set
+
+# the styles already emitted by the render in progress. Like the profiler's,
+# a ContextVar keeps concurrent renders apart, while the tasks of one async
+# render share it
+_active: ContextVar[Optional["Styles"]] = ContextVar("pytempl_styles", default=None)
+
+
+class Styles:
+    def __init__(self, inline: bool = True):
+        self.inline = inline
+        # content hash -> stylesheet, in the order components first used them
+        self.sheets: Dict[str, str] = {}
+        # keys of the other markup emitted once, see once()
+        self.emitted: Set[str] = set()
+
+    def bundle(self) -> str:
+        return "\n".join(self.sheets.values())
+
+
+@contextmanager
+def collect(inline: bool = True) -> Iterator[Styles]:
+    """Render each extracted stylesheet at most once inside the block, where
+    it's first used. With `inline=False` nothing is emitted and the sheets are
+    only gathered, for a build to write them out as a bundle."""
+    current = Styles(inline)
+    token = _active.set(current)
+    try:
+        yield current
+    finally:
+        _active.reset(token)
+
+
+def style(key: str, css: str) -> str:
+    # called by code compiled with `Engine(extract_styles=True)`. Outside of
+    # `collect()` every use renders its stylesheet, like an inline <style>
+    current = _active.get()
+    if current is None:
+        return f"<style>{css}</style>"
+    if key in current.sheets:
+        return ""
+
+    current.sheets[key] = css
+    return f"<style>{css}</style>" if current.inline else ""
+
+
+def once(key: str, markup: str) -> str:
+    # called by code compiled with `Engine(csr_assets=...)` for the tags that
+    # load client components. Unlike a stylesheet it can't be bundled, so it
+    # is emitted where first used even when the sheets aren't inlined
+    current = _active.get()
+    if current is None:
+        return markup
+    if key in current.emitted:
+        return ""
+
+    current.emitted.add(key)
+    return markup
+
+
+__all__ = ["Styles", "collect", "once", "style"]
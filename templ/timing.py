@@ -0,0 +1,48 @@
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict
+
+PHASES = ["parse", "transform", "format", "minify", "write", "render"]
+
+
+@dataclass
+class Timings:
+    seconds: Dict[str, float] = field(default_factory=dict)
+    calls: Dict[str, int] = field(default_factory=dict)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float, calls: int = 1):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + calls
+
+    def merge(self, other: "Timings"):
+        for name, seconds in other.seconds.items():
+            self.add(name, seconds, other.calls[name])
+
+    @property
+    def total(self) -> float:
+        return sum(self.seconds.values())
+
+    def report(self) -> str:
+        # with workers > 1 the phases add up CPU time across processes, so the
+        # total can be more than the wall time of the build
+        names = [name for name in PHASES if name in self.seconds]
+        names += [name for name in self.seconds if name not in PHASES]
+
+        lines = [f"{'phase':<12}{'calls':>8}{'total (ms)':>14}{'share':>8}"]
+        for name in names:
+            seconds = self.seconds[name]
+            share = seconds / self.total if self.total else 0.0
+            lines.append(
+                f"{name:<12}{self.calls[name]:>8}{seconds * 1000:>14.1f}{share:>8.0%}"
+            )
+        lines.append(f"{'total':<12}{'':>8}{self.total * 1000:>14.1f}")
+        return "\n".join(lines)
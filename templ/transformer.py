@@ -1,21 +1,52 @@
-import secrets
-from dataclasses import dataclass
+import hashlib
+import json
+import textwrap
+from dataclasses import dataclass, replace
 from string import Template
-from typing import List
+from typing import Callable, Dict, List, Literal, Optional, Set, Tuple
 
 import lark
-from lark import Token, Tree
+from lark import Token, Tree, v_args
+from lark.tree import Meta
 
-from templ.ast.components import ComponentDirective
+from templ.assets import asset_name, asset_url
+from templ.ast.components import Component, ComponentDirective
 from templ.ast.csr import CSRComponent
-
-function_template = Template(
-    """
-def $name($params):
-    $python_code
-    return ( $markup )
-"""
+from templ.ast.markup import Branch, Call, Expr, For, If, Node, Text, uses_slot
+from templ.codegen import (
+    async_body,
+    async_prelude,
+    async_template,
+    autoescape_prelude,
+    cache_prelude,
+    concat,
+    escape_markup,
+    fold,
+    fold_literals,
+    function_template,
+    generator_template,
+    inline_static,
+    instrument,
+    join,
+    merge_text,
+    profiler_prelude,
+    lazy_prelude,
+    once_prelude,
+    stream,
+    styles_prelude,
 )
+from templ.htmlmin import (
+    VOID_ELEMENTS,
+    minify_css,
+    minify_js,
+    minify_markup,
+    unquote_attribute,
+)
+from templ.optimizer import hoist_slots, inline_leaves, lazy_names
+
+
+# what client scripts have always been able to import
+REAKTIV_WHEEL = "https://files.pythonhosted.org/packages/dd/3a/0e8db597f12cd77e61ebe915a3f9a6f83cff0501a3980dec5be049858a8a/reaktiv-0.19.2-py3-none-any.whl"
 
 pyodide_template = Template(
     """
@@ -23,11 +54,9 @@ let pyodide;
 
 async function main(){
     pyodide = await loadPyodide();
-    await pyodide.loadPackage("https://files.pythonhosted.org/packages/dd/3a/0e8db597f12cd77e61ebe915a3f9a6f83cff0501a3980dec5be049858a8a/reaktiv-0.19.2-py3-none-any.whl");
+    await pyodide.loadPackage($packages);
 
-    pyodide.runPython(`
-    $python_code
-    `);
+    $run
     }
 main();
 """
@@ -38,6 +67,26 @@ main();
 class Script:
     type: str
     content: str
+    # set when the script is emitted once per render, under this key
+    key: Optional[str] = None
+
+
+@dataclass
+class FromImport:
+    module: str
+    names: List[str]
+
+    def render(self, lazy: Set[str]) -> str:
+        # lazy names are bound to proxies that import the module on first call
+        eager = [name for name in self.names if name not in lazy]
+        deferred = [name for name in self.names if name in lazy]
+        lines = []
+        if eager:
+            lines.append(f"from {self.module} import {','.join(eager)}")
+        if deferred:
+            names = ", ".join(repr(name) for name in deferred)
+            lines.append(f"_lazy(globals(), {self.module!r}, {names})")
+        return "\n".join(lines)
 
 
 @dataclass
@@ -46,18 +95,105 @@ class Attribute:
     value: str
 
 
+def flatten(children: List) -> List[Node]:
+    # elements hand their children up as nested lists and trees, untouched.
+    # They're spread out here, once per body, so every node is copied a
+    # single time however deep the markup is nested
+    nodes: List[Node] = []
+    stack = [iter(children)]
+    while stack:
+        for child in stack[-1]:
+            if isinstance(child, Tree):
+                child = child.children
+            if isinstance(child, list):
+                stack.append(iter(child))
+                break
+            if isinstance(child, Text) and not child.value:
+                continue
+            nodes.append(child)
+        else:
+            stack.pop()
+    return merge_text(nodes)
+
+
+def inline_styles(nodes: List[Node], styles: Dict[str, str]) -> List[Node]:
+    # client components run in the browser, without templ.styles to call
+    inlined: List[Node] = []
+    for node in nodes:
+        if isinstance(node, Expr) and node.code in styles:
+            node = Text(styles[node.code])
+        elif isinstance(node, Call) and node.slot is not None:
+            node = replace(node, slot=inline_styles(node.slot, styles))
+        elif isinstance(node, If):
+            node = If(
+                [
+                    Branch(b.condition, inline_styles(b.body, styles))
+                    for b in node.branches
+                ]
+            )
+        elif isinstance(node, For):
+            node = replace(node, body=inline_styles(node.body, styles))
+        inlined.append(node)
+    return merge_text(inlined)
+
+
+def code(value) -> str:
+    if isinstance(value, Expr):
+        return value.code
+    if isinstance(value, Tree):
+        return code(value.children[0])
+    return str(value)
+
+
 class Transformer(lark.Transformer):
-    def __init__(self, csr_packages: List[str] = []):
+    def __init__(
+        self,
+        csr_packages: List[str] = [],
+        backend: Literal["concat", "join", "stream"] = "concat",
+        autoescape: bool = False,
+        fold_constants: bool = False,
+        instrument: bool = False,
+        filename: str = "<template>",
+        optimize_calls: bool = False,
+        extract_styles: bool = False,
+        minify_html: bool = False,
+        source_hash: str = "",
+        lazy_imports: bool = False,
+        csr_assets: Optional[str] = None,
+        client_packages: Optional[Callable[[], Tuple[List[str], List[str]]]] = None,
+    ):
         self.csr_packages = csr_packages
+        self.backend = backend
+        self.autoescape = autoescape
+        self.fold_constants = fold_constants
+        self.instrument = instrument
+        self.filename = filename
+        self.optimize_calls = optimize_calls
+        self.extract_styles = extract_styles
+        self.minify_html = minify_html
+        self.source_hash = source_hash
+        self.lazy_imports = lazy_imports
+        # the URL client code is served from, None to inline it
+        self.csr_assets = csr_assets
+        # what client components and client scripts load, asked for only
+        # once one is emitted, since it may have to download them first
+        self.client_packages = client_packages or (
+            lambda: (self.csr_packages, [REAKTIV_WHEEL])
+        )
+        # the code of each extracted stylesheet's call, to its inline form
+        self.styles: Dict[str, str] = {}
+        # file name -> content of the static files the template needs
+        self.assets: Dict[str, str] = {}
 
     def simple_import(self, children: List[Token | Tree[Token]]):
-        return f"import {children[0].children[0].children[0]}"
+        modules = [".".join(module.children) for module in children[0].children]
+        return f"import {', '.join(modules)}"
 
     def from_import(self, children: List[Token | Tree[Token]]):
-        module_name = ".".join(list(children[0].find_data("module_name"))[0].children)
-        import_list = list(children[1].find_data("import_list"))[0].children[0].children
+        module_name = ".".join(children[0].children)
+        import_list = [str(item.children[0]) for item in children[1].children]
 
-        return f"from {module_name} import {','.join(import_list)}"
+        return FromImport(module_name, import_list)
 
     def import_stmt(self, children: List[Token | Tree[Token]]):
         return children[0]
@@ -68,7 +204,7 @@ class Transformer(lark.Transformer):
         # Remove the {{ and }} and extract the Python expression
         python_expr = content[2:-2].strip()
 
-        return python_expr
+        return Expr(python_expr)
 
     def quoted_interpolation(self, children: List[Token | Tree[Token]]):
         # For QUOTED_INTERPOLATION terminal: "{{ expression }}"
@@ -76,83 +212,72 @@ class Transformer(lark.Transformer):
         # Remove the quotes and {{ }} and extract the Python expression
         python_expr = content[3:-3].strip()  # Remove "{{ and }}"
 
-        return "' +" + python_expr + "+'"
+        return Expr(python_expr)
 
     def if_clause(self, children: List[Token | Tree[Token]]):
         condition = children[0].value.strip()  # PYTHON_CONDITION terminal
-
-        block_content = "+".join(
-            list(map(lambda v: "+".join(v.children), children[1:]))
-        )
-        return {"type": "if", "condition": condition, "content": block_content}
+        return Branch(condition, flatten(children[1:]))
 
     def elif_clause(self, children: List[Token | Tree[Token]]):
         condition = children[0].value.strip()  # PYTHON_CONDITION terminal
-        # block_content = "+".join(children[1:][0].children)
-        block_content = "+".join(
-            list(map(lambda v: "+".join(v.children), children[1:]))
-        )
-        return {"type": "elif", "condition": condition, "content": block_content}
+        return Branch(condition, flatten(children[1:]))
 
     def else_clause(self, children: List[Token | Tree[Token]]):
         # else clause has no condition, all children are template elements
-        block_content = "+".join(list(map(lambda v: "+".join(v.children), children)))
-        return {"type": "else", "content": block_content}
+        return Branch(None, flatten(children))
 
     def if_statement(self, children: List[Token | Tree[Token]]):
         # children contains: [if_clause, elif_clause*, else_clause?]
-        clauses = children
-
-        # Build the nested conditional expression from right to left
-        result = "''"  # Default empty string if no conditions match
+        return If(children)
 
-        # Process clauses in reverse order to build proper nesting
-        for clause in reversed(clauses):
-            if clause["type"] == "else":
-                result = f"({clause['content']})"
-            elif clause["type"] in ["if", "elif"]:
-                result = f"({clause['content']} if {clause['condition']} else {result})"
+    def location(self, meta: Meta) -> str:
+        return f"{self.filename}:{meta.line}" if not meta.empty else self.filename
 
-        return result
-
-    def for_loop(self, children: List[Token | Tree[Token]]):
+    @v_args(meta=True)
+    def for_loop(self, meta: Meta, children: List[Token | Tree[Token]]):
         item = children[0]
-        items = children[1]
-        body = "+".join(["+".join(child.children) for child in children[2:]])
-        result = f"''.join([{body} for {item} in {items}])"
-
-        return result
+        items = code(children[1])
+        return For(
+            str(item), items, flatten(children[2:]), location=self.location(meta)
+        )
 
     def control_flow(self, children: List[Token | Tree[Token]]):
-        return "".join(children)
+        return children[0]
 
     def body_text(self, children: List[Token | Tree[Token]]):
         return self.text_content(children)
 
     def text_content(self, children: List[Token | Tree[Token]]):
         text = children[0].value.strip()
-        return f"'{text}'"
+        return Text(text)
 
     def attribute(self, children: List[Token | Tree[Token]]):
         attr_name = children[0]
-        attr_value = list(children[1].find_data("attribute_value"))[0].children[0]
-
-        return f"{attr_name}={attr_value}"
+        if len(children) == 1:
+            return [Text(f" {attr_name}")]
+
+        attr_value = children[1].children[0]
+        if isinstance(attr_value, Token) and attr_value.type == "INTERPOLATION_BLOCK":
+            attr_value = Expr(attr_value.value[2:-2].strip())
+        if isinstance(attr_value, Expr):
+            # always quoted: escape() leaves spaces and "=" alone, so an
+            # unquoted value could add attributes of its own. Only literal
+            # values below are ever unquoted
+            return [Text(f' {attr_name}="'), attr_value, Text('"')]
+
+        attr_value = str(attr_value)
+        if self.minify_html:
+            attr_value = unquote_attribute(attr_value)
+        return [Text(f" {attr_name}="), Text(attr_value)]
 
     def doctype(self, children: List[Token | Tree[Token]]):
-        return f"'<!DOCTYPE " + children[0].value + ">'"
+        return Text("<!DOCTYPE " + children[0].value + ">")
 
     def html_element(self, children: List[Token | Tree[Token]]):
-        output = []
         tag_name = children[0].children[0]
 
         # Collect attributes if present
         attributes_nodes = list(filter(lambda v: v.data == "attributes", children))
-        has_attributes = len(attributes_nodes) > 0
-        attrs_str = ""
-        if has_attributes:
-            attributes: Token | Tree[Token] = attributes_nodes[0]
-            attrs_str = " " + " ".join(attributes.children)
 
         element_content_nodes = list(
             filter(lambda v: v.data == "element_content", children)
@@ -160,22 +285,24 @@ class Transformer(lark.Transformer):
         is_self_closing = len(element_content_nodes) == 0
 
         if is_self_closing:
-            return f"'<{tag_name}{attrs_str}/>'"
-
-        opening_tag = []
-        opening_tag.append(f"'<{tag_name}")
-        if has_attributes:
-            opening_tag.append(attrs_str)
-        opening_tag.append(">'")
-        output.append("".join(opening_tag).strip())
-
-        for content in element_content_nodes[0].children:
-            if isinstance(content, str):
-                output.append(content)
-
-        output.append(f"'</{tag_name}>'")
-
-        return "+".join(output)
+            # void elements need no "/", and HTML ignores it anyway
+            if self.minify_html and tag_name in VOID_ELEMENTS:
+                return [Text(f"<{tag_name}"), attributes_nodes, Text(">")]
+            # HTML reads the "/" into an unquoted value before it, so the
+            # value minifying unquoted gets its quotes back
+            if self.minify_html and attributes_nodes:
+                last = attributes_nodes[0].children[-1]
+                if len(last) == 2 and not last[1].value.startswith('"'):
+                    last[1] = Text(f'"{last[1].value}"')
+            return [Text(f"<{tag_name}"), attributes_nodes, Text("/>")]
+
+        return [
+            Text(f"<{tag_name}"),
+            attributes_nodes,
+            Text(">"),
+            element_content_nodes,
+            Text(f"</{tag_name}>"),
+        ]
 
     def script_attr(self, children: List[Token | Tree[Token]]):
         attr_name = children[0].value
@@ -214,54 +341,66 @@ class Transformer(lark.Transformer):
                 )
 
                 script.append(
-                    "'<script "
+                    "<script "
                     + " ".join([f"{attr.name}={attr.value}" for attr in attrs])
-                    + ">'"
+                    + ">"
                 )
 
-                content = (
-                    list(children[1].find_data("script_content"))[0]
-                    .children[0]
-                    .value.split("\n")
-                )
+                content = children[1].children[0].value.split("\n")
+                python_code = "\n".join(content)
+                _, packages = self.client_packages()
+                if self.csr_assets is None:
+                    run = f"pyodide.runPython(`\n    {python_code}\n    `);"
+                    key = None
+                else:
+                    # served as a file of its own, so it's a module like any other
+                    module = textwrap.dedent(python_code).strip() + "\n"
+                    key = asset_name("client", module, "py")
+                    self.assets[key] = module
+                    url = json.dumps(asset_url(self.csr_assets, key))
+                    run = f"pyodide.runPython(await (await fetch({url})).text());"
+                # loadPackage takes one package or a list of them
+                if len(packages) == 1:
+                    packages = packages[0]
                 script.append(
-                    "'''"
-                    + pyodide_template.substitute(
-                        python_code="\n".join(content),
-                    )
-                    + "'''"
+                    pyodide_template.substitute(packages=json.dumps(packages), run=run)
                 )
 
-                script.append("'</script>'")
+                script.append("</script>")
 
-                return Script("javascript", "".join(script))
-            for inner in list(children[1].find_data("script_content"))[0].children:
+                return Script("javascript", "".join(script), key)
+            for inner in children[1].children:
                 script.append(inner)
 
             return Script("python", "\n".join(script))
         else:
             script.append(
-                "'<script "
+                "<script "
                 + " ".join([f"{attr.name}={attr.value}" for attr in attrs])
-                + ">'"
+                + ">"
             )
 
-            if len(children) > 1:
-                for inner in (
-                    list(children[1].find_data("script_content"))[0]
-                    .children[0]
-                    .value.strip()
-                    .split("\n")
-                ):
-                    script.append(
-                        "'" + inner.strip() + "'",
-                    )
-            script.append("'</script>'")
+            if len(children) > 1 and self.minify_html:
+                script.append(minify_js(children[1].children[0].value))
+            elif len(children) > 1:
+                for inner in children[1].children[0].value.strip().split("\n"):
+                    script.append(inner.strip())
+            script.append("</script>")
 
-            return Script("javascript", "+".join(script))
+            return Script("javascript", "".join(script))
 
     def style_block(self, children: List[Token | Tree[Token]]):
-        return '"""<style>' + children[0].children[0] + '</style>"""'
+        css = str(children[-1].children[0])
+        if self.minify_html:
+            css = minify_css(css)
+        if not self.extract_styles:
+            return Text("<style>" + css + "</style>")
+
+        # keyed by content, so components sharing a stylesheet share its entry
+        key = hashlib.sha256(css.encode()).hexdigest()[:12]
+        call = f"_style({key!r}, {css!r})"
+        self.styles[call] = "<style>" + css + "</style>"
+        return Expr(call, safe=True)
 
     def dict_literal(self, children: List[Token | Tree[Token]]):
         if len(children) == 0:
@@ -273,65 +412,57 @@ class Transformer(lark.Transformer):
 
     def dict_item(self, children: List[Token | Tree[Token]]):
         key = children[0]
-        value = children[1]
+        value = code(children[1])
 
         return f"{key}: {value}"
 
     def list_literal(self, children: List[Token | Tree[Token]]):
+        if len(children) == 0:
+            return "[]"
+
         items = children[0].children
 
-        return "[" + "".join(items) + "]"
+        return "[" + ", ".join(items) + "]"
+
+    def list_item(self, children: List[Token | Tree[Token]]):
+        return code(children[0])
 
     def template_element(self, children: List[Token | Tree[Token]]):
-        return "+".join(children)
+        return children
 
-    def template_block(self, children: List[Token | Tree[Token]]):
-        result = []
-        for child in children:
-            result.extend(child.children)
+    def body_element(self, children: List[Token | Tree[Token]]):
+        return children
 
-        return "+".join(result)
+    def template_block(self, children: List[Token | Tree[Token]]):
+        return children
 
     def component_body_call(self, children: List[Token | Tree[Token]]):
-        body_content = []
-        if len(children) > 0:
-            body_elements = children[0].children  # body_content children
-            for element in body_elements:
-                element: str = element.children[0]
-                if len(element.strip("'")) == 0:
-                    continue
-                body_content.append(element)
-
-        return "+".join(body_content)
-
-    def component_call(self, children: List[Token | Tree[Token]]):
+        return children
+
+    @v_args(meta=True)
+    def component_call(self, meta: Meta, children: List[Token | Tree[Token]]):
         component_name = children[0].children[0]
         component_args = []
 
         # Handle regular arguments
-        if len(children) > 1 and hasattr(children[1], "children"):
+        if len(children) > 1 and isinstance(children[1], Tree):
             for arg in children[1].children:
-                if hasattr(arg, "children") and arg.children:
-                    component_args.append(str(arg.children[0]))
-                else:
-                    component_args.append(str(arg))
+                component_args.append(code(arg))
 
         # Handle body call (slot content) - pass as last argument
-        if len(children) >= 2:  # Has component_body_call
-            slot_content = children[-1]
-            if isinstance(slot_content, Tree):
-                slot_content = "".join(slot_content.children[0].children)
-            if slot_content.startswith("''+"):
-                slot_content = slot_content[3:]
-            if slot_content.startswith("''"):
-                slot_content = slot_content[2:]
-
-            component_args.append(f"lambda: {slot_content}")  # Pass as string to slot
-
-        args_str = ", ".join(component_args)
-        call = f"{component_name}({args_str})"
+        slot_content = None
+        if isinstance(children[-1], list):
+            slot_content = flatten(children[-1])
+
+        return Call(
+            str(component_name),
+            component_args,
+            slot_content,
+            location=self.location(meta),
+        )
 
-        return call
+    def keyword_arg(self, children: List[Token | Tree[Token]]):
+        return f"{children[0]}={code(children[1])}"
 
     def component_directive(self, children: List[Token | Tree[Token]]):
         return ComponentDirective(
@@ -344,36 +475,31 @@ class Transformer(lark.Transformer):
 
     def component_directive_value(self, children: List[Token | Tree[Token]]):
         value = []
-        component_arg = list(children[0].find_data("component_arg"))
+        if not children:
+            return value
 
-        for arg in component_arg:
-            value.extend([str(child) for child in arg.children])
+        for arg in children[0].children:
+            value.extend([code(child) for child in arg.children])
 
         return value
 
     def component_def(self, children: List[Token | Tree[Token]]):
-        output = ""
-
         directives: List[ComponentDirective] = list(
             filter(lambda v: isinstance(v, ComponentDirective), children)
         )
         children = children[len(directives) :]
 
-        component_name = (
-            list(
-                list(children[0].find_data("component_name"))[0].find_pred(
-                    lambda v: isinstance(v, Tree)
-                )
-            )[0]
-            .children[0]
-            .value
-        )
+        is_async = children[0].data == "async_modifier"
+        if is_async:
+            children = children[1:]
+
+        component_name = children[0].children[0].value
         params = list(filter(lambda v: v.data == "params", children))
         params_name = []
         if len(params) > 0:
-            params_name.append(params[0].children[0].value)
+            params_name.extend(param.value for param in params[0].children)
 
-        markup = []
+        markup: List = []
         python = []
         javascript = []
 
@@ -381,56 +507,179 @@ class Transformer(lark.Transformer):
         if len(component_body) > 0:
             component_body: Token | Tree[Token] = component_body[0]
 
-        for blocks in list(component_body.find_data("component_element")):
+        for blocks in component_body.children:
             for block in blocks.children:
                 if isinstance(block, Script):
-                    if block.type == "javascript":
-                        javascript.append(block.content)
+                    if block.type == "javascript" and block.key is not None:
+                        call = f"_once({block.key!r}, {block.content!r})"
+                        javascript.append(Expr(call, safe=True))
+                    elif block.type == "javascript":
+                        javascript.append(Text(block.content))
                     elif block.type == "python":
                         python.append(block.content)
-                elif isinstance(block, str):
+                else:
                     markup.append(block)
 
-        has_slot = component_body.pretty("").find("slot") >= 0
-        if has_slot:
+        markup = flatten(markup)
+        if uses_slot(markup):
             params_name.append("slot")
 
-        template_block = list(component_body.find_data("template_element"))
-        for element in template_block:
-            targets = element.children[0]
-            if isinstance(targets, list):
-                markup.extend(targets)
-            elif isinstance(targets, str):
-                markup.append(targets)
-
-        output += function_template.substitute(
+        return Component(
             name=component_name,
-            params=", ".join(params_name),
+            params=params_name,
             python_code="\n".join(f"    {line}" for line in python),
-            markup="+".join([*markup, *javascript]),
+            markup=[*markup, *javascript],
+            directives=directives,
+            is_async=is_async,
+        )
+
+    def decorators(self, component: Component) -> str:
+        decorators = []
+        for directive in component.directives:
+            if directive.name == "cache":
+                decorators.append(f"@_cache({', '.join(directive.value)})")
+        return "\n".join(decorators)
+
+    def generate(self, component: Component) -> str:
+        markup = component.markup
+        if self.autoescape:
+            # component and slot calls aren't escaped: their output is markup
+            markup = fold(escape_markup(markup))
+        if self.instrument and not component.is_async:
+            # async siblings render concurrently, so there's no call stack
+            # to attribute their time to
+            markup = instrument(markup)
+
+        if component.is_async:
+            lines, output = async_body(markup)
+            if self.autoescape:
+                output = f"_Markup({output})"
+
+            return async_template.substitute(
+                decorators=self.decorators(component),
+                name=component.name,
+                params=", ".join(component.params),
+                python_code=component.python_code,
+                body="\n".join(lines),
+                markup=output,
+            )
+
+        if self.backend == "stream":
+            return generator_template.substitute(
+                decorators=self.decorators(component),
+                name=component.name,
+                params=", ".join(component.params),
+                python_code=component.python_code,
+                body="\n".join(stream(markup) or ["    yield ''"]),
+            )
+
+        output = join(markup) if self.backend == "join" else concat(markup)
+        if self.autoescape:
+            # so a component's output passed through props isn't escaped again
+            output = f"_Markup({output})"
+
+        return function_template.substitute(
+            decorators=self.decorators(component),
+            name=component.name,
+            params=", ".join(component.params),
+            python_code=component.python_code,
+            markup=output,
         )
 
+    def component_id(self, name: str) -> str:
+        # the same source always gets the same id, so unchanged templates
+        # compile to unchanged bytes
+        digest = hashlib.sha256(f"{self.source_hash}:{name}".encode()).hexdigest()
+        return f"{name}-{digest[:20]}"
+
+    def render_component(self, component: Component):
         is_csr = False
         interpreter = "mpy"
-        mode = list(filter(lambda v: v.name == "mode", directives))
+        mode = list(filter(lambda v: v.name == "mode", component.directives))
         if mode:
             is_csr = mode[0].value[0].strip('"')
             if len(mode[0].value) > 1:
                 interpreter = mode[0].value[1].strip('"')
 
-        if is_csr:
-            return CSRComponent(
-                id=f"{component_name}-{secrets.token_hex(10)}",
-                name=component_name,
-                content=output,
-                interpreter=interpreter,
-                packages=self.csr_packages,
-            )
+        if not is_csr:
+            return self.generate(component)
+        if self.styles:
+            component.markup = inline_styles(component.markup, self.styles)
+
+        # the client runs the plain string version whatever the backend
+        output = function_template.substitute(
+            decorators="",
+            name=component.name,
+            params=", ".join(component.params),
+            python_code=component.python_code,
+            markup=concat(component.markup),
+        )
 
-        return output
+        csr = CSRComponent(
+            id=self.component_id(component.name),
+            name=component.name,
+            content=output,
+            interpreter=interpreter,
+            packages=self.client_packages()[0],
+            stream=self.backend == "stream",
+        )
+        if self.csr_assets is not None:
+            module = csr.module()
+            file_name = asset_name(component.name, module, "py")
+            self.assets[file_name] = module
+            csr.src = asset_url(self.csr_assets, file_name)
+        return csr.render()
 
     def program(self, children: List[Token | Tree[Token]]):
-        for idx, child in enumerate(children):
-            if isinstance(child, CSRComponent):
-                children[idx] = child.render()
-        return "\n".join(children)
+        components = [child for child in children if isinstance(child, Component)]
+        if self.fold_constants:
+            for component in components:
+                component.markup = fold_literals(component.markup, self.autoescape)
+        hoisted = []
+        if self.optimize_calls and not self.instrument:
+            # profiling wants every call site kept, so static components and
+            # leaves stay calls then
+            inline_static(components)
+            inline_leaves(components)
+        else:
+            for component in components:
+                component.markup = fold(component.markup)
+        if self.optimize_calls:
+            hoisted = hoist_slots(components)
+        if self.minify_html:
+            for component in [*components, *hoisted]:
+                component.markup = minify_markup(component.markup)
+
+        lazy: Set[str] = set()
+        if self.lazy_imports:
+            imported = [
+                name
+                for child in children
+                if isinstance(child, FromImport)
+                for name in child.names
+            ]
+            lazy = lazy_names([*components, *hoisted], imported)
+
+        output = [autoescape_prelude] if self.autoescape else []
+        if lazy:
+            output.append(lazy_prelude)
+        if any(d.name == "cache" for c in components for d in c.directives):
+            output.append(cache_prelude)
+        if any(component.is_async for component in components):
+            output.append(async_prelude)
+        if self.instrument:
+            output.append(profiler_prelude)
+        if self.extract_styles:
+            output.append(styles_prelude)
+        for child in children:
+            if isinstance(child, Component):
+                child = self.render_component(child)
+            elif isinstance(child, FromImport):
+                child = child.render(lazy)
+            output.append(child)
+        for component in hoisted:
+            output.append(self.generate(component))
+        if self.assets:
+            # known once the components are rendered
+            output.insert(0, once_prelude)
+        return "\n".join(output)